@@ -1,12 +1,16 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
-from groq import Groq
+import sys
+import hashlib
 from dotenv import load_dotenv
-from operator import attrgetter
 from io import BytesIO
+from cohort_engine import CohortPartials
+from cohort_ingest import FILTER_COLUMNS, FORMATS, filtered_rows, ingest
+from heatmaps import RENDERERS, plotly_heatmap, render_png
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repo root, for shared/
+from shared.llm_client import get_client
 
 # Load API key
 load_dotenv()
@@ -19,80 +23,90 @@ if not GROQ_API_KEY:
 st.set_page_config(layout="wide")
 st.title("🤖 FP&A AI Agent - SaaS Cohort Analysis")
 
-st.markdown("Upload an Excel file, analyze retention, churn, and revenue growth by cohort, and get FP&A insights!")
+st.markdown("Upload an Excel, CSV or Parquet file, analyze retention, churn, and revenue growth by cohort, and get FP&A insights!")
+
+uploaded_file = st.file_uploader("📂 Upload your cohort data (Excel, CSV or Parquet)", type=list(FORMATS))
+
+
+@st.cache_resource(max_entries=4, show_spinner="Reading file...")
+def load_partials(file_hash, _uploaded_file, name):
+    # Keyed on the file hash: filter changes reuse the per-(BU, Mgmt Type) partials instead of re-reading
+    accumulator = ingest(_uploaded_file, name)
+    partials = CohortPartials(accumulator.activity, accumulator.has_revenue)
+    return partials, accumulator.preview, accumulator.rows_read
+
+
+def show_heatmap(matrix, fmt, cmap, title=None):
+    if renderer == RENDERERS[1]:
+        st.plotly_chart(plotly_heatmap(matrix, fmt, cmap, title), use_container_width=True)
+    else:
+        st.image(render_png(matrix, fmt, cmap, title), use_container_width=True)
 
-uploaded_file = st.file_uploader("📂 Upload your cohort data (Excel format)", type=["xlsx"])
 
 if uploaded_file:
-    df = pd.read_excel(uploaded_file)
-    df['Date'] = pd.to_datetime(df['Date'])
+    # === Streaming Ingest ===
+    # Only the cohort columns are read, chunk by chunk, into customer-month activity
+    file_hash = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+    partials, preview, rows_read = load_partials(file_hash, uploaded_file, uploaded_file.name)
+    has_revenue = partials.has_revenue
 
     # === Apply Filters ===
-    if "Business Unit" in df.columns and "Management Type" in df.columns:
+    filters = {}
+    if len(partials.partition_columns) == len(FILTER_COLUMNS):
         st.subheader("🔍 Filter Options")
-        selected_bu = st.multiselect("Select Business Unit(s)", sorted(df["Business Unit"].dropna().unique()), default=None)
-        selected_mgmt = st.multiselect("Select Management Type(s)", sorted(df["Management Type"].dropna().unique()), default=None)
+        selected_bu = st.multiselect("Select Business Unit(s)", partials.options("Business Unit"), default=None)
+        selected_mgmt = st.multiselect("Select Management Type(s)", partials.options("Management Type"), default=None)
+        filters = {"Business Unit": selected_bu, "Management Type": selected_mgmt}
+
+    if not len(partials.selected(filters)):
+        st.warning("No rows match the selected filters.")
+        st.stop()
 
-        if selected_bu:
-            df = df[df["Business Unit"].isin(selected_bu)]
-        if selected_mgmt:
-            df = df[df["Management Type"].isin(selected_mgmt)]
+    renderer = st.radio("Heatmap renderer", RENDERERS, horizontal=True)
 
     # === Build Cohort Data ===
-    df['CohortMonth'] = df.groupby('Customer_ID')['Date'].transform('min').dt.to_period('M')
-    df['PurchaseMonth'] = df['Date'].dt.to_period('M')
-    df['CohortIndex'] = (df['PurchaseMonth'] - df['CohortMonth']).apply(attrgetter('n'))
+    cohorts = partials.matrices(filters)
 
     st.subheader("📊 Data Preview")
-    st.dataframe(df.head())
+    st.caption(f"{rows_read:,} rows read into {len(partials.pair):,} customer-months")
+    st.dataframe(preview)
 
     # === Retention Matrix ===
-    retention_counts = df.pivot_table(index='CohortMonth', columns='CohortIndex', values='Customer_ID', aggfunc='nunique')
-    cohort_sizes = retention_counts.iloc[:, 0]
-    retention_rate = retention_counts.divide(cohort_sizes, axis=0)
+    retention_counts = cohorts.retention_counts
+    retention_rate = cohorts.retention_rate
 
     st.subheader("🔥 Retention Heatmap")
-    plt.figure(figsize=(16, 9))
-    sns.heatmap(retention_rate, annot=True, fmt=".0%", cmap="YlGnBu", linewidths=0.5)
-    st.pyplot(plt)
+    show_heatmap(retention_rate, ".0%", "YlGnBu")
 
     # === Revenue + Avg Revenue Cohort ===
     avg_revenue_per_user = None  # <- Fix: Define before use
 
-    if 'Revenue' in df.columns:
+    if has_revenue:
         st.subheader("💰 Cohort Revenue Heatmap")
-        revenue_matrix = df.pivot_table(index='CohortMonth', columns='CohortIndex', values='Revenue', aggfunc='sum')
-        plt.figure(figsize=(16, 9))
-        sns.heatmap(revenue_matrix, annot=True, fmt=".0f", cmap="OrRd", linewidths=0.5)
-        st.pyplot(plt)
+        revenue_matrix = cohorts.revenue
+        show_heatmap(revenue_matrix, ".0f", "OrRd")
 
         st.subheader("📈 Growth Cohort Breakdown (Avg Revenue per Customer)")
-        avg_revenue_per_user = revenue_matrix / retention_counts
-        avg_revenue_per_user = avg_revenue_per_user.fillna(0)
-        plt.figure(figsize=(16, 9))
-        sns.heatmap(avg_revenue_per_user, annot=True, fmt=".0f", cmap="BuGn", linewidths=0.5)
-        plt.title("Average Revenue per Customer", fontsize=14)
-        st.pyplot(plt)
+        avg_revenue_per_user = cohorts.avg_revenue_per_user
+        show_heatmap(avg_revenue_per_user, ".0f", "BuGn", "Average Revenue per Customer")
 
     # === Churn Report ===
     st.subheader("📉 Customer Churn Report")
-    churn_df = retention_rate.copy().fillna(0)
-    churn_df = churn_df.applymap(lambda x: 1 - x)
-    plt.figure(figsize=(16, 9))
-    sns.heatmap(churn_df, annot=True, fmt=".0%", cmap="Reds", linewidths=0.5)
-    plt.title("Churn Rate by Cohort", fontsize=14)
-    st.pyplot(plt)
+    churn_df = cohorts.churn
+    show_heatmap(churn_df, ".0%", "Reds", "Churn Rate by Cohort")
 
     # === Export Options ===
     st.subheader("📥 Download Export Files")
-    csv_buffer = df.to_csv(index=False).encode("utf-8")
-    st.download_button("⬇️ Download Filtered Data (CSV)", data=csv_buffer, file_name="filtered_data.csv", mime="text/csv")
+    if st.checkbox("Prepare filtered data export (re-reads the file)"):
+        chunks = filtered_rows(uploaded_file, uploaded_file.name, filters)
+        csv_buffer = "".join(chunk.to_csv(index=False, header=i == 0) for i, chunk in enumerate(chunks)).encode("utf-8")
+        st.download_button("⬇️ Download Filtered Data (CSV)", data=csv_buffer, file_name="filtered_data.csv", mime="text/csv")
 
     excel_buffer = BytesIO()
     with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
         retention_rate.to_excel(writer, sheet_name='Retention Rate')
         churn_df.to_excel(writer, sheet_name='Churn Rate')
-        if 'Revenue' in df.columns:
+        if has_revenue:
             revenue_matrix.to_excel(writer, sheet_name='Revenue')
             avg_revenue_per_user.to_excel(writer, sheet_name='Avg Revenue/User')
     st.download_button("⬇️ Download Cohort Matrices (Excel)", data=excel_buffer.getvalue(), file_name="cohort_analysis.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
@@ -112,14 +126,10 @@ Churn Rate (Sample):
 Average Revenue per User (Sample):
 {avg_revenue_per_user.head().to_string(index=True) if avg_revenue_per_user is not None else 'No Revenue data available.'}
 """
-        client = Groq(api_key=GROQ_API_KEY)
-        response = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": "You are an AI FP&A analyst providing insights from cohort, churn, and revenue analysis."},
-                {"role": "user", "content": f"{cohort_summary}\n{user_prompt}"}
-            ],
-            model="llama3-8b-8192",
-        )
-        ai_response = response.choices[0].message.content
+        messages = [
+            {"role": "system", "content": "You are an AI FP&A analyst providing insights from cohort, churn, and revenue analysis."},
+            {"role": "user", "content": f"{cohort_summary}\n{user_prompt}"}
+        ]
+        ai_response = get_client("groq", GROQ_API_KEY).complete("llama3-8b-8192", messages)
         st.subheader("💡 AI-Generated Insights")
         st.markdown(ai_response)
@@ -0,0 +1,134 @@
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+# Period[M] ordinals count months from 1970-01; ours are year*12 + month
+PERIOD_EPOCH = 1970 * 12 + 1
+
+
+class CohortMatrices(NamedTuple):
+    retention_counts: pd.DataFrame
+    retention_rate: pd.DataFrame
+    churn: pd.DataFrame
+    revenue: Optional[pd.DataFrame]
+    avg_revenue_per_user: Optional[pd.DataFrame]
+
+
+def month_ordinals(dates):
+    """year*12 + month as int32, with -1 for missing dates."""
+    valid = dates.notna().to_numpy()
+    months = np.full(len(dates), -1, dtype=np.int32)
+    months[valid] = dates.dt.year.to_numpy()[valid] * 12 + dates.dt.month.to_numpy()[valid]
+    return months
+
+
+def to_periods(ordinals):
+    """Monthly Periods from Period[M] ordinals, for matrix labels."""
+    return pd.PeriodIndex(pd.arrays.PeriodArray(np.asarray(ordinals, dtype="int64"), dtype=pd.PeriodDtype("M")))
+
+
+def _derive(retention_counts, revenue=None):
+    """Rates, churn and ARPU from the customer-count and revenue matrices."""
+    cohort_sizes = retention_counts.iloc[:, 0]
+    retention_rate = retention_counts.divide(cohort_sizes, axis=0)
+    churn = 1 - retention_rate.fillna(0)
+
+    avg_revenue_per_user = None
+    if revenue is not None:
+        avg_revenue_per_user = (revenue / retention_counts).fillna(0)
+    return CohortMatrices(retention_counts, retention_rate, churn, revenue, avg_revenue_per_user)
+
+
+class CohortPartials:
+    """Customer-month activity split into one contiguous slice per (Business Unit, Management Type).
+
+    Built once per uploaded file. A filter selection only gathers the selected slices and
+    bins them with np.bincount, so no rows are rescanned. Customer counts aren't additive
+    across partitions (one customer can buy in several), so each row keeps a global
+    customer-month id and the union is de-duplicated on those ids before counting. Cohort months are
+    re-derived within the selection, as when the raw rows were filtered.
+    """
+
+    def __init__(self, activity, has_revenue=None, partition_columns=('Business Unit', 'Management Type')):
+        if has_revenue is None:
+            has_revenue = 'Revenue' in activity.columns
+        self.has_revenue = has_revenue
+        self.partition_columns = [c for c in partition_columns if c in activity.columns]
+
+        if self.partition_columns:
+            grouped = activity.groupby(self.partition_columns, sort=False, dropna=False, observed=True)
+            partition = grouped.ngroup().to_numpy()
+            self.partitions = grouped.size().reset_index()[self.partition_columns]
+        else:
+            partition = np.zeros(len(activity), dtype=np.int64)
+            self.partitions = pd.DataFrame(index=range(1))
+        order = np.argsort(partition, kind='stable')
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(partition, minlength=len(self.partitions)))])
+
+        months = activity['Month'].to_numpy(dtype=np.int64)[order]
+        self.first_month = int(months.min()) if len(months) else 0
+        months -= self.first_month
+        self.n_months = int(months.max()) + 1 if len(months) else 1
+        customer = pd.factorize(activity['Customer_ID'].to_numpy()[order])[0].astype(np.int64)
+        self.n_customers = int(customer.max()) + 1 if len(order) else 0
+        # Every row points at a global customer-month id, so unions de-duplicate with one bincount
+        pair_key, pair = np.unique(customer * self.n_months + months, return_inverse=True)
+        self.pair = pair.astype(np.int32)
+        self.pair_customer = (pair_key // self.n_months).astype(np.int32)
+        self.pair_month = (pair_key % self.n_months).astype(np.int32)
+        self.revenue = activity['Revenue'].to_numpy(dtype=np.float64)[order] if has_revenue else None
+
+    def options(self, column):
+        """Sorted non-null values of a partition column, for the filter widgets."""
+        return sorted(self.partitions[column].dropna().unique())
+
+    def selected(self, filters=None):
+        """Partition numbers matching {column: values}; empty/None values mean no filter."""
+        keep = np.ones(len(self.partitions), dtype=bool)
+        for column, values in (filters or {}).items():
+            if values and column in self.partitions.columns:
+                keep &= self.partitions[column].isin(values).to_numpy()
+        return np.flatnonzero(keep)
+
+    def matrices(self, filters=None):
+        """CohortMatrices for the rows matching `filters`, equal to filtering the raw rows first."""
+        parts = self.selected(filters)
+        slices = [slice(self.offsets[p], self.offsets[p + 1]) for p in parts]
+        pair = _gather(self.pair, slices)
+        revenue = _gather(self.revenue, slices) if self.has_revenue else None
+        if len(parts) > 1:
+            # The same customer-month can sit in several partitions: count it once, sum its revenue
+            if revenue is not None:
+                revenue = np.bincount(pair, weights=revenue, minlength=len(self.pair_customer))
+            pair = np.flatnonzero(np.bincount(pair, minlength=len(self.pair_customer)))
+            if revenue is not None:
+                revenue = revenue[pair]
+        customer, month = self.pair_customer[pair], self.pair_month[pair]
+
+        first = np.full(self.n_customers, self.n_months, dtype=np.int32)
+        np.minimum.at(first, customer, month)
+        cohort = first[customer]
+        cell = cohort.astype(np.int64) * self.n_months + (month - cohort)
+        cells = self.n_months * self.n_months
+        counts = np.bincount(cell, minlength=cells).reshape(self.n_months, self.n_months)
+
+        rows = np.flatnonzero(counts.any(axis=1))
+        cols = np.flatnonzero(counts.any(axis=0))
+        present = counts[np.ix_(rows, cols)] > 0
+        labels = {
+            'index': pd.Index(to_periods(rows + self.first_month - PERIOD_EPOCH), name='CohortMonth'),
+            'columns': pd.Index(cols.astype('int64'), name='CohortIndex'),
+        }
+        retention_counts = pd.DataFrame(np.where(present, counts[np.ix_(rows, cols)], np.nan), **labels)
+        revenue_matrix = None
+        if revenue is not None:
+            sums = np.bincount(cell, weights=revenue, minlength=cells).reshape(self.n_months, self.n_months)
+            revenue_matrix = pd.DataFrame(np.where(present, sums[np.ix_(rows, cols)], np.nan), **labels)
+        return _derive(retention_counts, revenue_matrix)
+
+
+def _gather(values, slices):
+    if len(slices) == 1:
+        return values[slices[0]]
+    return np.concatenate([values[s] for s in slices]) if slices else values[:0]
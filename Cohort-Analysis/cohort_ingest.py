@@ -0,0 +1,162 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from cohort_engine import month_ordinals
+
+# Only these columns are ever read from an upload; everything else is skipped at parse time
+INGEST_COLUMNS = ["Customer_ID", "Date", "Revenue", "Business Unit", "Management Type"]
+FILTER_COLUMNS = ["Business Unit", "Management Type"]
+CHUNK_ROWS = 200_000
+FORMATS = ("xlsx", "csv", "parquet")
+
+
+def file_format(name):
+    ext = os.path.splitext(str(name))[1].lower().lstrip(".")
+    if ext not in FORMATS:
+        raise ValueError(f"Unsupported file type '.{ext}', expected one of {FORMATS}")
+    return ext
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+
+def _csv_chunks(source, chunk_rows):
+    reader = pd.read_csv(
+        _rewind(source), usecols=lambda c: c in INGEST_COLUMNS, chunksize=chunk_rows,
+        dtype={"Customer_ID": str, "Business Unit": str, "Management Type": str},
+    )
+    with reader:
+        yield from reader
+
+
+def _parquet_chunks(source, chunk_rows):
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(_rewind(source))
+    columns = [c for c in INGEST_COLUMNS if c in parquet.schema_arrow.names]
+    for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns):
+        yield batch.to_pandas()
+
+
+def _xlsx_chunks(source, chunk_rows):
+    from openpyxl import load_workbook
+
+    # read_only streams rows from the sheet XML instead of building the whole workbook
+    workbook = load_workbook(_rewind(source), read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        wanted = [(i, h) for i, h in enumerate(header) if h in INGEST_COLUMNS]
+        positions = [i for i, _ in wanted]
+        columns = [h for _, h in wanted]
+        batch = []
+        for row in rows:
+            batch.append([row[i] if i < len(row) else None for i in positions])
+            if len(batch) >= chunk_rows:
+                yield pd.DataFrame(batch, columns=columns)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns)
+    finally:
+        workbook.close()
+
+
+_READERS = {"csv": _csv_chunks, "parquet": _parquet_chunks, "xlsx": _xlsx_chunks}
+
+
+def iter_chunks(source, name, chunk_rows=CHUNK_ROWS):
+    """DataFrames of at most `chunk_rows` rows holding only INGEST_COLUMNS, from a path or upload."""
+    yield from _READERS[file_format(name)](source, chunk_rows)
+
+
+class CohortAccumulator:
+    """Folds chunks into one row per (Business Unit, Management Type, customer, purchase month).
+
+    Rows are never kept: each chunk is reduced to its distinct customer-months (revenue summed)
+    and merged into the running table, so memory follows customers x active months, not rows.
+    Cohort months are derived at the end, because a later chunk can still move a customer's
+    first purchase earlier.
+    """
+
+    def __init__(self, compact_rows=CHUNK_ROWS):
+        self.compact_rows = compact_rows
+        self.columns = set()
+        self.rows_read = 0
+        self.preview = None
+        self._parts = []
+        self._pending = 0
+
+    @property
+    def keys(self):
+        return [c for c in FILTER_COLUMNS if c in self.columns] + ["Customer_ID", "Month"]
+
+    @property
+    def has_revenue(self):
+        return "Revenue" in self.columns
+
+    def add(self, chunk):
+        if self.preview is None:
+            self.preview = chunk.head()
+        self.columns.update(chunk.columns)
+        self.rows_read += len(chunk)
+
+        months = month_ordinals(pd.to_datetime(chunk["Date"]))
+        valid = (months >= 0) & chunk["Customer_ID"].notna().to_numpy()
+        part = pd.DataFrame({"Customer_ID": chunk["Customer_ID"].to_numpy()[valid], "Month": months[valid]})
+        for col in FILTER_COLUMNS:
+            if col in chunk.columns:
+                part[col] = chunk[col].to_numpy()[valid]
+        if self.has_revenue:
+            part["Revenue"] = chunk["Revenue"].to_numpy()[valid] if "Revenue" in chunk.columns else np.nan
+
+        self._parts.append(self._reduce(part))
+        self._pending += len(self._parts[-1])
+        if self._pending >= self.compact_rows:
+            self._compact()
+        return self
+
+    def _reduce(self, part):
+        keys = [k for k in self.keys if k in part.columns]
+        grouped = part.groupby(keys, sort=False, dropna=False)
+        if "Revenue" in part.columns:
+            return grouped["Revenue"].sum().reset_index()
+        return grouped.size().reset_index()[keys]
+
+    def _compact(self):
+        if len(self._parts) > 1:
+            self._parts = [self._reduce(pd.concat(self._parts, ignore_index=True))]
+        self._pending = len(self._parts[0]) if self._parts else 0
+
+    @property
+    def activity(self):
+        """Distinct (filters..., Customer_ID, Month) rows with summed Revenue when present."""
+        self._compact()
+        if not self._parts:
+            return pd.DataFrame(columns=self.keys)
+        activity = self._parts[0].copy()
+        for col in FILTER_COLUMNS:
+            if col in activity.columns:
+                activity[col] = activity[col].astype("category")
+        return activity
+
+
+def ingest(source, name, chunk_rows=CHUNK_ROWS):
+    """Stream `source` through a CohortAccumulator."""
+    accumulator = CohortAccumulator(compact_rows=chunk_rows)
+    for chunk in iter_chunks(source, name, chunk_rows):
+        accumulator.add(chunk)
+    return accumulator
+
+
+def filtered_rows(source, name, filters, chunk_rows=CHUNK_ROWS):
+    """Re-stream `source` keeping only rows whose filter columns are in `filters` ({column: values})."""
+    for chunk in iter_chunks(source, name, chunk_rows):
+        for col, values in filters.items():
+            if values:
+                chunk = chunk[chunk[col].isin(values)]
+        yield chunk
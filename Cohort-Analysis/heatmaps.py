@@ -0,0 +1,72 @@
+import io
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import seaborn as sns
+from matplotlib.figure import Figure
+
+ANNOT_MAX_CELLS = 400   # above this, per-cell labels cost more than they tell
+CACHE_ENTRIES = 32
+RENDERERS = ("Static (matplotlib)", "Interactive (Plotly)")
+
+_lock = threading.Lock()
+_rendered = OrderedDict()  # matrix hash -> PNG bytes, shared by every session in the process
+
+
+def matrix_hash(matrix, *params):
+    """Content hash of a matrix's values, labels and the rendering parameters."""
+    digest = hashlib.sha256(pd.util.hash_pandas_object(matrix, index=True).to_numpy().tobytes())
+    digest.update(repr((list(matrix.columns.astype(str)), params)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def render_png(matrix, fmt, cmap, title=None, figsize=(16, 9)):
+    """Seaborn heatmap as PNG bytes, rendered once per matrix hash.
+
+    Uses a standalone Figure rather than pyplot, so nothing is left in pyplot's figure
+    registry between reruns and concurrent sessions don't share drawing state.
+    """
+    key = matrix_hash(matrix, fmt, cmap, title, figsize)
+    with _lock:
+        if key in _rendered:
+            _rendered.move_to_end(key)
+            return _rendered[key]
+
+    fig = Figure(figsize=figsize)
+    try:
+        ax = fig.subplots()
+        annot = matrix.size <= ANNOT_MAX_CELLS
+        sns.heatmap(matrix, annot=annot, fmt=fmt, cmap=cmap, linewidths=0.5 if annot else 0, ax=ax)
+        if title:
+            ax.set_title(title, fontsize=14)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", bbox_inches="tight")
+    finally:
+        fig.clear()
+    png = buffer.getvalue()
+
+    with _lock:
+        _rendered[key] = png
+        while len(_rendered) > CACHE_ENTRIES:
+            _rendered.popitem(last=False)
+    return png
+
+
+def plotly_heatmap(matrix, fmt, cmap, title=None):
+    """Interactive Plotly heatmap; cell labels only while the matrix has at most ANNOT_MAX_CELLS cells."""
+    import plotly.graph_objects as go
+
+    text = {"texttemplate": f"%{{z:{fmt}}}"} if matrix.size <= ANNOT_MAX_CELLS else {}
+    fig = go.Figure(go.Heatmap(
+        z=matrix.to_numpy(dtype=float),
+        x=[str(c) for c in matrix.columns],
+        y=[str(i) for i in matrix.index],
+        colorscale=cmap,
+        hovertemplate=f"{matrix.index.name}: %{{y}}<br>{matrix.columns.name}: %{{x}}<br>%{{z:{fmt}}}<extra></extra>",
+        **text,
+    ))
+    fig.update_yaxes(autorange="reversed")
+    fig.update_layout(title=title, height=600, xaxis_title=matrix.columns.name, yaxis_title=matrix.index.name)
+    return fig
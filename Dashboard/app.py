@@ -2,6 +2,32 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from ingest import load_typed, upload_hash
+from cube import SalesCube
+from query import (
+    ROW_BUDGET, bar_data, combined_mask, date_range, heatmap_data, page, page_count, sample_rows,
+)
+
+
+@st.cache_resource(max_entries=4, show_spinner="Loading dataset...")
+def load_dataset(file_hash, _data, name):
+    # Keyed on the upload hash; the frame is shared across reruns, so treat it as read-only
+    return load_typed(_data, name, key=file_hash)
+
+
+@st.cache_resource(max_entries=4, show_spinner="Aggregating...")
+def load_cube(file_hash, _df):
+    # One rollup pass per upload; every KPI and chart below reads from it
+    return SalesCube(_df)
+
+
+def show_table(data, key):
+    # Only the current page is sent to the browser
+    pages = page_count(len(data))
+    number = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=key) if pages > 1 else 1
+    st.caption(f"{len(data):,} rows")
+    st.dataframe(page(data, number), use_container_width=True)
+
 
 def main():
     st.set_page_config(
@@ -27,12 +53,11 @@ def main():
     )
 
     if uploaded_file is not None:
-        # Read the file
+        # Read the file (parsed and typed once per upload, then reused across reruns)
         try:
-            if uploaded_file.name.endswith(".csv"):
-                df = pd.read_csv(uploaded_file)
-            else:
-                df = pd.read_excel(uploaded_file)
+            data = uploaded_file.getvalue()
+            file_hash = upload_hash(data)
+            df = load_dataset(file_hash, data, uploaded_file.name)
         except Exception as e:
             st.error(f"Error reading file: {e}")
             return
@@ -59,11 +84,7 @@ def main():
         # ------------------------------------------------------------
         # KPI Section (conditionally compute KPIs if columns exist)
         # ------------------------------------------------------------
-        
-        def get_col_sum(data, col_name):
-            if col_name in data.columns:
-                return data[col_name].sum()
-            return 0
+        cube = load_cube(file_hash, df)
 
         def safe_div(num, den):
             try:
@@ -71,19 +92,19 @@ def main():
             except:
                 return 0
 
-        total_revenue = get_col_sum(df, "Sales")
-        total_profit = get_col_sum(df, "Profit")
-        cost_savings = get_col_sum(df, "Discounts")
+        total_revenue = cube.total("Sales")
+        total_profit = cube.total("Profit")
+        cost_savings = cube.total("Discounts")
         profit_margin = safe_div(total_profit, total_revenue) * 100
 
         yoy_growth = 0
         if ("Year" in df.columns) and ("Sales" in df.columns):
-            years = sorted(df["Year"].unique())
+            years = sorted(cube.values("Year"))
             if len(years) > 1:
                 latest_year = years[-1]
                 prior_year = years[-2]
-                latest_sales = df.loc[df["Year"] == latest_year, "Sales"].sum()
-                prior_sales = df.loc[df["Year"] == prior_year, "Sales"].sum()
+                latest_sales = cube.total("Sales", {"Year": latest_year})
+                prior_sales = cube.total("Sales", {"Year": prior_year})
                 yoy_growth = safe_div((latest_sales - prior_sales), prior_sales) * 100
 
         col1, col2, col3, col4 = st.columns(4)
@@ -103,7 +124,7 @@ def main():
         # ------------------------------------------------------------
         if "Country" in df.columns and "Sales" in df.columns:
             st.subheader("Geographical Sales Map")
-            country_sales = df.groupby("Country", as_index=False)["Sales"].sum()
+            country_sales = cube.rollup(["Country"], measures=["Sales"])
             fig_map = px.choropleth(
                 country_sales, 
                 locations="Country", 
@@ -132,27 +153,39 @@ def main():
             default=default_cols
         )
         
-        filter_mask = [True] * len(df)
-        if "Country" in df.columns:
-            unique_countries = df["Country"].unique().tolist()
+        drill_filters = {}
+        if "Country" in cube.dimensions:
+            unique_countries = cube.values("Country")
             selected_country = st.selectbox("Filter by Country (Optional)", ["All"] + unique_countries)
             if selected_country != "All":
-                filter_mask = df["Country"] == selected_country
-        if "Year" in df.columns:
-            unique_years = df["Year"].unique().tolist()
+                drill_filters["Country"] = selected_country
+        if "Year" in cube.dimensions:
+            unique_years = cube.values("Year")
             selected_year = st.selectbox("Filter by Year (Optional)", ["All"] + unique_years)
             if selected_year != "All":
-                filter_mask = filter_mask & (df["Year"] == selected_year)
+                drill_filters["Year"] = selected_year
 
-        filtered_data = df.loc[filter_mask, selected_columns]
-        st.dataframe(filtered_data, use_container_width=True)
+        aggregate = cube.covers(selected_columns) and st.checkbox(
+            "Aggregate rows (sum the selected measures per combination of the selected dimensions)",
+            value=False,
+        )
+        if aggregate:
+            # Opt-in: roll up the cube instead of listing rows
+            by = [col for col in selected_columns if col in cube.dimensions]
+            measures = [col for col in selected_columns if col in cube.measures]
+            filtered_data = cube.rollup(by, drill_filters, measures)[selected_columns]
+            st.caption("Rows are aggregated: each row sums the records sharing its dimension values.")
+        else:
+            filter_mask = combined_mask(df, {col: [value] for col, value in drill_filters.items()})
+            filtered_data = df.loc[filter_mask, selected_columns]
+        show_table(filtered_data, key="drill_down_page")
 
         # ------------------------------------------------------------
         # Waterfall Chart
         # ------------------------------------------------------------
         if "Segment" in df.columns and "Sales" in df.columns:
             st.subheader("Waterfall Chart: Revenue Breakdown")
-            segment_sales = df.groupby("Segment", as_index=False)["Sales"].sum()
+            segment_sales = cube.rollup(["Segment"], measures=["Sales"])
             measure = ["relative"] * len(segment_sales)
             waterfall_trace = go.Waterfall(
                 name="Segment Breakdown",
@@ -182,30 +215,42 @@ def main():
         cat_cols = [col for col in df.columns if pd.api.types.is_string_dtype(df[col]) or df[col].dtype.name == "category"]
         date_cols = [col for col in df.columns if pd.api.types.is_datetime64_any_dtype(df[col])]
 
-        x_axis = st.selectbox("X-Axis", options=cat_cols + num_cols)
+        x_axis = st.selectbox("X-Axis", options=cat_cols + date_cols + num_cols)
         y_axis = st.selectbox("Y-Axis", options=num_cols if chart_type != "Heatmap" else cat_cols)
         color = st.selectbox("Color Dimension (Optional)", options=[None] + cat_cols + num_cols)
 
         st.subheader("Apply Filters (Optional)")
+        row_budget = st.number_input("Row budget for charts", min_value=1_000, value=ROW_BUDGET, step=10_000)
         filters = {}
-        for col in cat_cols + date_cols:
+        for col in cat_cols:
             unique_vals = df[col].dropna().unique()
             selected_vals = st.multiselect(f"Filter by {col}", options=unique_vals, default=unique_vals)
             filters[col] = selected_vals
+        for col in date_cols:
+            low, high = df[col].min(), df[col].max()
+            if pd.isna(low):
+                continue
+            picked = st.date_input(f"Filter by {col}", value=(low.date(), high.date()), min_value=low.date(), max_value=high.date())
+            if isinstance(picked, tuple) and len(picked) == 2:
+                filters[col] = date_range(*picked)
 
-        for col, selected_vals in filters.items():
-            df = df[df[col].isin(selected_vals)]
+        # All filters fold into one mask; rows are only gathered once, for the columns the chart needs
+        mask = combined_mask(df, filters)
+        chart_cols = list(dict.fromkeys(col for col in (x_axis, y_axis, color) if col is not None))
+        df = df.loc[mask, chart_cols]
 
         st.subheader("Generated Visualization")
         if chart_type == "Heatmap":
             if color in num_cols:  # Ensure "Color Dimension" is numerical
+                cells = heatmap_data(df, x_axis, y_axis, color)
                 heatmap_fig = px.density_heatmap(
-                    df, 
-                    x=x_axis, 
-                    y=y_axis, 
-                    z=color, 
+                    cells, 
+                    x="x", 
+                    y="y", 
+                    z="z", 
                     histfunc="sum", 
                     color_continuous_scale="Viridis",
+                    labels={"x": x_axis, "y": y_axis, "z": color},
                     title=f"Heatmap of {color} by {x_axis} and {y_axis}"
                 )
                 st.plotly_chart(heatmap_fig, use_container_width=True)
@@ -215,8 +260,11 @@ def main():
                     "Please select a valid numerical column for 'Color Dimension (Optional)'."
                 )
         elif chart_type == "Boxplot":
+            sampled = sample_rows(df, row_budget)
+            if len(sampled) < len(df):
+                st.caption(f"Showing a random sample of {len(sampled):,} of {len(df):,} rows.")
             boxplot_fig = px.box(
-                df, 
+                sampled, 
                 x=x_axis, 
                 y=y_axis, 
                 color=color,
@@ -224,8 +272,11 @@ def main():
             )
             st.plotly_chart(boxplot_fig, use_container_width=True)
         elif chart_type == "Bar Graph":
+            segments, reduced = bar_data(df, x_axis, y_axis, color, row_budget)
+            if reduced:
+                st.caption(f"Too many bar segments for the row budget: numeric colours are binned and at most {row_budget:,} segments are shown.")
             bar_fig = px.bar(
-                df, 
+                segments, 
                 x=x_axis, 
                 y=y_axis, 
                 color=color,
@@ -0,0 +1,56 @@
+import pandas as pd
+
+DIMENSIONS = ["Country", "Segment", "Product", "Year", "Month Number"]
+MEASURES = ["Sales", "Profit", "COGS", "Discounts", "Units Sold"]
+
+
+class SalesCube:
+    """Measure sums per (Country, Segment, Product, Year, Month Number) cell, built in one pass.
+
+    KPIs, the map, the waterfall and drill-downs roll these cells up instead of scanning the
+    rows, so their cost depends on the number of cells, not on the size of the upload.
+    """
+
+    def __init__(self, df):
+        self.dimensions = [c for c in DIMENSIONS if c in df.columns]
+        self.measures = [c for c in MEASURES if c in df.columns and pd.api.types.is_numeric_dtype(df[c])]
+        # Accumulate in float64/int64 whatever the stored dtype (e.g. a float32 Parquet copy)
+        wide = {c: "float64" if pd.api.types.is_float_dtype(df[c]) else "int64" for c in self.measures}
+        frame = df[self.dimensions].assign(**{c: df[c].astype(dtype) for c, dtype in wide.items()})
+        if self.dimensions:
+            grouped = frame.groupby(self.dimensions, observed=True, dropna=False, sort=False)
+            self.cells = grouped[self.measures].sum().reset_index()
+        else:
+            self.cells = frame[self.measures].sum().to_frame().T
+        self.rows = len(df)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def covers(self, columns):
+        """True when every column is a dimension or measure of the cube."""
+        return all(c in self.dimensions or c in self.measures for c in columns)
+
+    def _filtered(self, filters):
+        cells = self.cells
+        for column, value in (filters or {}).items():
+            cells = cells[cells[column] == value]
+        return cells
+
+    def total(self, measure, filters=None):
+        """Sum of `measure` over the cells matching {dimension: value}; 0 when the column is missing."""
+        if measure not in self.measures:
+            return 0
+        return self._filtered(filters)[measure].sum()
+
+    def values(self, dimension):
+        """Distinct values of a dimension, in first-seen order."""
+        return self.cells[dimension].dropna().unique().tolist()
+
+    def rollup(self, by, filters=None, measures=None):
+        """Measures summed by `by` over the cells matching {dimension: value}."""
+        measures = [m for m in (measures or self.measures) if m in self.measures]
+        cells = self._filtered(filters)
+        if not by:
+            return cells[measures].sum().to_frame().T
+        return cells.groupby(list(by), observed=True, as_index=False, sort=True)[measures].sum()
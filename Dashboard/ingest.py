@@ -0,0 +1,97 @@
+import io
+import os
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(REPO_ROOT, ".cache", "dashboard")
+KEEP_FILES = 8  # typed Parquet copies kept on disk, most recently used first
+
+CATEGORICAL_COLUMNS = ["Segment", "Country", "Product", "Discount Band", "Month Name"]
+
+
+def upload_hash(data):
+    """Content hash of an uploaded file, used as the cache key for its typed frame."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def read_upload(data, name):
+    """Parse raw CSV/XLSX bytes."""
+    if name.lower().endswith(".csv"):
+        return pd.read_csv(io.BytesIO(data))
+    return pd.read_excel(io.BytesIO(data))
+
+
+def _parse_dates(series):
+    """Sales files repeat a few hundred distinct dates, so parse each distinct value once."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    codes, uniques = pd.factorize(series)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), errors="coerce").to_numpy()
+    return pd.Series(np.where(codes >= 0, parsed[codes], np.datetime64("NaT")), index=series.index)
+
+
+def _downcast_int(values):
+    """int32 when the values fit; sums still come back as int64, but products and cumsums should widen first."""
+    info = np.iinfo(np.int32)
+    if len(values) and (values.min() < info.min or values.max() > info.max):
+        return values
+    return values.astype(np.int32)
+
+
+def optimize(df):
+    """Parse Date, shrink whole-number columns and turn repeated labels into categoricals.
+
+    Fractional columns (Sales, Profit, COGS...) stay float64: a float32 column sums in float32,
+    which drifts by hundreds on a million-row upload and feeds straight into the KPIs.
+    """
+    df = df.copy()
+    if "Date" in df.columns:
+        df["Date"] = _parse_dates(df["Date"])
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            df[col] = _downcast_int(series.to_numpy())
+        elif pd.api.types.is_float_dtype(series):
+            values = series.to_numpy(dtype=np.float64)
+            whole = np.isfinite(values).all() and (values == np.round(values)).all()
+            if whole:
+                df[col] = _downcast_int(values.astype(np.int64))
+        elif col in CATEGORICAL_COLUMNS:
+            df[col] = series.astype("category")
+    return df
+
+
+def parquet_path(key, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f"{key}.parquet")
+
+
+def _prune(cache_dir, keep=KEEP_FILES):
+    files = [os.path.join(cache_dir, f) for f in os.listdir(cache_dir) if f.endswith(".parquet")]
+    for stale in sorted(files, key=os.path.getmtime, reverse=True)[keep:]:
+        os.remove(stale)
+
+
+def load_typed(data, name, key=None, cache_dir=CACHE_DIR):
+    """Typed frame for an upload: read from its Parquet copy when one exists, else parse and write one."""
+    path = parquet_path(key or upload_hash(data), cache_dir)
+    if os.path.exists(path):
+        os.utime(path)
+        return pd.read_parquet(path)
+
+    df = optimize(read_upload(data, name))
+    tmp = f"{path}.tmp-{os.getpid()}"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        _prune(cache_dir)
+    except Exception:
+        # The Parquet copy is only an optimisation (e.g. mixed-type object columns can't be written)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return df
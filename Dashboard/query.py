@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+ROW_BUDGET = 50_000   # most rows a chart may ship to the browser
+PAGE_SIZE = 500
+HEATMAP_BINS = 50
+
+
+def combined_mask(df, filters):
+    """One boolean mask for every filter, without copying the frame per column.
+
+    `filters` maps a column to either a list of allowed values or a (low, high) range tuple.
+    Categorical columns are matched on their codes. Like `isin`, a list filter always drops
+    rows with no value in that column, whether or not every value is selected.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for col, allowed in filters.items():
+        series = df[col]
+        if isinstance(allowed, tuple):
+            low, high = allowed
+            mask &= ((series >= low) & (series <= high)).to_numpy()
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            keep = series.cat.categories.isin(allowed)
+            codes = series.cat.codes.to_numpy()
+            mask &= (codes >= 0) & keep[np.maximum(codes, 0)]
+        else:
+            mask &= series.isin(allowed).to_numpy()
+    return mask
+
+
+def bar_data(df, x, y, color=None, budget=ROW_BUDGET, bins=HEATMAP_BINS):
+    """Sum y per x (and color) so the bar chart gets one row per bar segment, not one per record.
+
+    Returns (segments, reduced). Past `budget` segments a numeric color is binned into `bins`
+    ranges, and if that's still too many only the `budget` largest segments are kept.
+    """
+    keys = [x] if color in (None, x) else [x, color]
+    segments = df.groupby(keys, observed=True, as_index=False, sort=True)[y].sum()
+    if len(segments) <= budget:
+        return segments, False
+    if len(keys) == 2 and pd.api.types.is_numeric_dtype(df[color]):
+        binned = df[[x, y]].assign(**{color: _binned(df[color], bins)})
+        segments = binned.groupby(keys, observed=True, as_index=False, sort=True)[y].sum()
+    if len(segments) > budget:
+        segments = segments.loc[segments[y].abs().nlargest(budget).index].sort_values(keys)
+    return segments, True
+
+
+def _binned(series, bins):
+    """Numeric columns with many distinct values are replaced by their bin midpoints."""
+    if not pd.api.types.is_numeric_dtype(series) or series.nunique() <= bins:
+        return series
+    return pd.cut(series, bins).map(lambda interval: interval.mid).astype(float)
+
+
+def heatmap_data(df, x, y, z, bins=HEATMAP_BINS):
+    """Sum z per (x, y) cell server-side, as columns "x", "y", "z".
+
+    density_heatmap with histfunc="sum" over these cells draws the same picture as over the raw rows.
+    """
+    cells = pd.DataFrame({"x": _binned(df[x], bins), "y": _binned(df[y], bins), "z": df[z]})
+    cells = cells.groupby(["x", "y"], observed=True, as_index=False)["z"].sum()
+    return cells.set_axis(["x", "y", "z"], axis=1)
+
+
+def sample_rows(df, budget=ROW_BUDGET, seed=0):
+    """At most `budget` rows, sampled uniformly (reproducibly) when the frame is larger."""
+    if len(df) <= budget:
+        return df
+    return df.sample(n=budget, random_state=seed)
+
+
+def page(df, number, size=PAGE_SIZE):
+    """Rows of page `number` (1-based)."""
+    start = (max(number, 1) - 1) * size
+    return df.iloc[start:start + size]
+
+
+def page_count(rows, size=PAGE_SIZE):
+    return max(1, -(-rows // size))
+
+
+def date_range(start, end):
+    """Inclusive (low, high) Timestamp bounds for a pair of calendar dates."""
+    return pd.Timestamp(start), pd.Timestamp(end) + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from cube import SalesCube
+from ingest import optimize
+
+
+def _sales(rows=1_000_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Country": rng.choice(["Canada", "France", "Germany", "Mexico"], rows),
+        "Segment": rng.choice(["Government", "Midmarket", "Enterprise"], rows),
+        "Year": rng.choice([2013, 2014], rows),
+        "Sales": np.round(rng.uniform(10, 100_000, rows), 2),
+        "Units Sold": rng.integers(1, 5_000, rows).astype(float),
+    })
+
+
+def test_optimized_sales_total_matches_float64():
+    raw = _sales()
+    expected = raw["Sales"].to_numpy(dtype=np.float64).sum()
+    typed = optimize(raw)
+    assert typed["Sales"].dtype == np.float64
+    assert typed["Sales"].sum() == expected
+    assert abs(SalesCube(typed).total("Sales") - expected) <= 1e-9 * expected
+
+
+def test_cube_accumulates_float32_columns_in_float64():
+    raw = _sales()
+    narrow = raw.assign(Sales=raw["Sales"].astype(np.float32))
+    exact = narrow["Sales"].to_numpy(dtype=np.float64).sum()
+    total = SalesCube(narrow).total("Sales")
+    assert abs(total - exact) <= 1e-9 * exact
+
+
+def test_whole_number_columns_still_shrink():
+    typed = optimize(_sales(rows=1_000))
+    assert typed["Units Sold"].dtype == np.int32
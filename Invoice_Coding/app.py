@@ -1,9 +1,14 @@
 import streamlit as st
 import pandas as pd
 import os
-import pdfplumber
-from fuzzywuzzy import process
-from groq import Groq
+import sys
+from coding_engine import code_invoice_stream, code_invoices, file_hash
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repo root, for shared/
+from shared.llm_client import get_client
+from shared.retrieval import CandidateRetriever
+from shared.pdf_tables import iter_pdf_tables
+from shared import coa_store
 
 # --- Page Config ---
 st.set_page_config(page_title="Invoice Coding Tool", layout="wide")
@@ -16,18 +21,27 @@ Uses fuzzy matching and Groq LLM for intelligent account suggestions.
 
 # === Read API key from Streamlit Secrets ===
 GROQ_API_KEY = st.secrets["GROQ_API_KEY"]
+client = get_client("groq", GROQ_API_KEY)
+LLM_MODEL = "mixtral-8x7b-32768"
+LLM_CANDIDATES = 15  # accounts shortlisted per description for the LLM prompt
 
 # --- Load Chart of Accounts ---
-@st.cache_data
+# Compiled to a memory-mapped Arrow file by the shared COA store and reused by every session
 def load_coa():
     coa_path = os.path.join(os.path.dirname(__file__), "coa_data", "chart_of_accounts.csv")
-    return pd.read_csv(coa_path)
+    return coa_store.load_coa(coa_path)
 
-coa = load_coa()
+chart = load_coa()
+coa = chart.df
 coa_descriptions = coa['Shipsure Account Description'].dropna().tolist()
 
-# --- Groq LLM Suggestion ---
-def get_llm_suggestion(description, coa_options):
+# --- Candidate Retriever (embeddings, BM25 fallback), built once per process ---
+@st.cache_resource(show_spinner="Indexing Chart of Accounts...")
+def load_retriever(descriptions):
+    return CandidateRetriever(descriptions, name="invoice-coding-coa")
+
+# --- Groq LLM Suggestions ---
+def suggestion_messages(description, candidates):
     prompt = f"""
 You are a finance assistant. Based on the invoice description, select the most appropriate account from the Chart of Accounts below.
 
@@ -35,60 +49,63 @@ Invoice Description:
 "{description}"
 
 Chart of Accounts Options:
-{chr(10).join(f"- {desc}" for desc in coa_options[:50])}
+{chr(10).join(f"- {desc}" for desc in candidates)}
 
 Respond with only the **exact account description** that matches best.
 """
-    try:
-        response = client.chat.completions.create(
-            model="mixtral-8x7b-32768",
-            messages=[
-                {"role": "system", "content": "You are a helpful finance assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2,
-            max_tokens=50,
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        return f"LLM Error: {e}"
+    return [
+        {"role": "system", "content": "You are a helpful finance assistant."},
+        {"role": "user", "content": prompt}
+    ]
+
+def get_llm_suggestions(descriptions, coa_options):
+    # Each prompt only lists the accounts most relevant to its description
+    shortlists = load_retriever(coa_options).candidates(descriptions, LLM_CANDIDATES)
+    # All prompts go out at once; the shared client bounds concurrency, rate-limits and retries
+    # Lines with no matching account are flagged instead of asking the LLM to pick from nothing
+    asked = [i for i, candidates in enumerate(shortlists) if candidates]
+    batch = [suggestion_messages(descriptions[i], shortlists[i]) for i in asked]
+    results = client.complete_many(LLM_MODEL, batch, temperature=0.2, max_tokens=50)
+    suggestions = ["No matching account found"] * len(descriptions)
+    for i, r in zip(asked, results):
+        suggestions[i] = f"LLM Error: {r}" if isinstance(r, Exception) else r
+    return suggestions
+
+# --- Batch Coding (cached per invoice file) ---
+@st.cache_data(show_spinner="Coding invoice lines...")
+def run_coding(invoice_hash, _invoices):
+    # Keyed on the file hash so widget interactions reuse results instead of re-running fuzzy + LLM
+    return code_invoices(_invoices, coa_descriptions, get_llm_suggestions)
+
+@st.cache_data(show_spinner="Extracting and coding PDF tables...")
+def run_pdf_coding(invoice_hash, _pdf_bytes):
+    # Pages are parsed in a process pool and each table is coded as soon as it is extracted
+    tables, coded = [], []
+    for table, result in code_invoice_stream(iter_pdf_tables(_pdf_bytes), coa_descriptions, get_llm_suggestions):
+        tables.append(table)
+        coded.append(result)
+    if not tables:
+        return None, None
+    return pd.concat(tables, ignore_index=True), pd.concat(coded, ignore_index=True)
 
 # --- File Upload ---
 st.sidebar.header("Step 1: Upload Invoice File")
 invoice_file = st.sidebar.file_uploader("Upload Invoice File (.xlsx, .csv, or .pdf)", type=["xlsx", "csv", "pdf"])
 
 if invoice_file:
+    invoice_hash = file_hash(invoice_file.getvalue())
     if invoice_file.name.endswith(".xlsx"):
         invoices = pd.read_excel(invoice_file)
     elif invoice_file.name.endswith(".csv"):
         invoices = pd.read_csv(invoice_file)
     elif invoice_file.name.endswith(".pdf"):
-        with pdfplumber.open(invoice_file) as pdf:
-            all_tables = []
-            for page in pdf.pages:
-                tables = page.extract_tables()
-                for table in tables:
-                    if table and len(table) > 1:
-                        headers = table[0]
-                        seen = {}
-                        unique_headers = []
-                        for h in headers:
-                            if h in seen:
-                                seen[h] += 1
-                                unique_headers.append(f"{h}_{seen[h]}")
-                            else:
-                                seen[h] = 0
-                                unique_headers.append(h)
-                        df = pd.DataFrame(table[1:], columns=unique_headers)
-                        all_tables.append(df)
-
-        if all_tables:
-            try:
-                invoices = pd.concat(all_tables, ignore_index=True)
-            except Exception as e:
-                st.error(f"Error combining tables: {e}")
-                st.stop()
+        try:
+            invoices, suggestions = run_pdf_coding(invoice_hash, invoice_file.getvalue())
+        except Exception as e:
+            st.error(f"Error extracting tables: {e}")
+            st.stop()
 
+        if invoices is not None:
             st.subheader("📄 Extracted Table from PDF")
             st.dataframe(invoices.head(), use_container_width=True)
         else:
@@ -101,39 +118,33 @@ if invoice_file:
     st.markdown("---")
     st.subheader("🔍 Invoice Coding Suggestions")
 
-    coded_invoices = []
-    for idx, row in invoices.iterrows():
-        description = str(row.get("Description", "")).strip()
-        amount = row.get("Amount", 0)
-        invoice_number = row.get("Invoice Number", f"Row {idx+1}")
-
-        # Fuzzy match
-        fuzzy_suggestions = process.extract(description, coa_descriptions, limit=3)
+    if not invoice_file.name.endswith(".pdf"):
+        suggestions = run_coding(invoice_hash, invoices)
 
-        # Groq LLM match
-        llm_suggestion = get_llm_suggestion(description, coa_descriptions)
+    selections = []
+    for idx, row in enumerate(suggestions.itertuples(index=False)):
+        invoice_number, description, amount, fuzzy_matches, llm_suggestion = row
 
         st.markdown(f"**Invoice {invoice_number} - {description[:60]}...**")
-        selected = st.selectbox(
+        selections.append(st.selectbox(
             f"Select fuzzy-matched account for invoice {invoice_number}:",
-            options=[s[0] for s in fuzzy_suggestions],
+            options=fuzzy_matches,
             index=0,
             key=f"select_{idx}"
-        )
-
-        coa_row = coa[coa['Shipsure Account Description'] == selected].iloc[0]
-        coded_invoices.append({
-            "Invoice Number": invoice_number,
-            "Description": description,
-            "Amount": amount,
-            "Mapped Account (Fuzzy)": selected,
-            "Mapped Account (Groq LLM)": llm_suggestion,
-            "Account Type": coa_row.get("Account Type", ""),
-            "HFM Account Number": coa_row.get("HFM Account Number", ""),
-            "HFM Description": coa_row.get("HFM Account Description", "")
-        })
-
-    result_df = pd.DataFrame(coded_invoices)
+        ))
+
+    # Resolve every selected account with one indexed join instead of a column scan per line
+    accounts = chart.bulk_lookup(selections, "Shipsure Account Description")
+    result_df = pd.DataFrame({
+        "Invoice Number": suggestions["Invoice Number"],
+        "Description": suggestions["Description"],
+        "Amount": suggestions["Amount"],
+        "Mapped Account (Fuzzy)": selections,
+        "Mapped Account (Groq LLM)": suggestions["Mapped Account (Groq LLM)"],
+        "Account Type": accounts["Account Type"].astype(object).fillna("").values,
+        "HFM Account Number": accounts["HFM Account Number"].astype(object).fillna("").values,
+        "HFM Description": accounts["HFM Account Description"].astype(object).fillna("").values,
+    })
 
     st.markdown("---")
     st.subheader("✅ Final Coded Invoices (Groq-enhanced)")
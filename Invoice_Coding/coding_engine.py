@@ -0,0 +1,95 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process, utils
+
+FUZZY_LIMIT = 3
+RANK_BLOCK = 1024  # descriptions ranked per block, bounds the int32 sort-key buffer
+
+
+def file_hash(data: bytes) -> str:
+    """Content hash of an uploaded invoice file, used as the cache key for coding results."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def fuzzy_top_matches(descriptions, choices, limit=FUZZY_LIMIT):
+    """Best `limit` (choice, score) pairs for every description, scored in one vectorized matrix."""
+    if not descriptions or not choices:
+        return [[] for _ in descriptions]
+    # Score each distinct description once; repeated invoice lines share a row of the matrix
+    unique = list(dict.fromkeys(descriptions))
+    scores = process.cdist(
+        unique, choices,
+        scorer=fuzz.WRatio, processor=utils.default_process,
+        dtype=np.float32, workers=-1,
+    )
+    limit = min(limit, len(choices))
+    # Rank by score, breaking ties on the earlier chart row like process.extract does.
+    # argpartition picks the top `limit` columns per row without a full sort, then order just those.
+    tiebreak = np.arange(len(choices) - 1, -1, -1, dtype=np.int32)
+    top = np.empty((len(unique), limit), dtype=np.intp)
+    for start in range(0, len(unique), RANK_BLOCK):
+        keys = np.rint(scores[start:start + RANK_BLOCK] * 100).astype(np.int32) * len(choices) + tiebreak
+        block = np.argpartition(keys, -limit, axis=1)[:, -limit:]
+        order = np.argsort(np.take_along_axis(keys, block, axis=1), axis=1)[:, ::-1]
+        top[start:start + RANK_BLOCK] = np.take_along_axis(block, order, axis=1)
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    matches = {
+        description: [(choices[j], int(round(s))) for j, s in zip(row, row_scores)]
+        for description, row, row_scores in zip(unique, top, top_scores)
+    }
+    return [matches[d] for d in descriptions]
+
+
+def llm_suggestions(descriptions, coa_options, suggest_many):
+    """Ask `suggest_many(unique_descriptions, coa_options)` once for every distinct, non-empty description.
+
+    The callable is expected to fan the prompts out concurrently (see shared/llm_client.py),
+    so a bulk run is bounded by provider throughput rather than one round trip per line.
+    """
+    unique = [d for d in dict.fromkeys(descriptions) if d]
+    answers = dict(zip(unique, suggest_many(unique, coa_options))) if unique else {}
+    return [answers.get(d, "") for d in descriptions]
+
+
+def code_invoices(invoices, coa_descriptions, suggest_many=None, start=0):
+    """Code every invoice line at once: fuzzy candidates for all rows, then one concurrent LLM stage.
+
+    `start` offsets the "Row N" labels used when there is no Invoice Number column.
+    """
+    descriptions = (
+        invoices["Description"].fillna("").astype(str).str.strip().tolist()
+        if "Description" in invoices.columns else [""] * len(invoices)
+    )
+    amounts = invoices["Amount"] if "Amount" in invoices.columns else pd.Series(0, index=invoices.index)
+    numbers = (
+        invoices["Invoice Number"]
+        if "Invoice Number" in invoices.columns
+        else pd.Series([f"Row {start + i + 1}" for i in range(len(invoices))], index=invoices.index)
+    )
+
+    fuzzy = fuzzy_top_matches(descriptions, coa_descriptions)
+    llm = (
+        llm_suggestions(descriptions, coa_descriptions, suggest_many)
+        if suggest_many is not None else [""] * len(descriptions)
+    )
+
+    return pd.DataFrame({
+        "Invoice Number": numbers.tolist(),
+        "Description": descriptions,
+        "Amount": amounts.tolist(),
+        "Fuzzy Matches": [[choice for choice, _ in matches] for matches in fuzzy],
+        "Mapped Account (Groq LLM)": llm,
+    })
+
+
+def code_invoice_stream(frames, coa_descriptions, suggest_many=None):
+    """Code tables as they arrive (e.g. from shared/pdf_tables.py), yielding (frame, coded) pairs.
+
+    Coding of the first pages overlaps with parsing of the later ones.
+    """
+    start = 0
+    for frame in frames:
+        yield frame, code_invoices(frame, coa_descriptions, suggest_many, start=start)
+        start += len(frame)
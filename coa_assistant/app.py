@@ -1,12 +1,15 @@
 import os
+import sys
 import streamlit as st
 import pandas as pd
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import faiss
 import datetime
-import requests
 import io
+from index_store import CSV_PATH, DEFAULT_MODEL, index_key, load_or_build, combined_sentences, search
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repo root, for shared/
+from shared.llm_client import get_client
+from shared import coa_store
 
 # === Page Config ===
 st.set_page_config(page_title="Chart of Accounts Assistant", page_icon="🧾", layout="wide")
@@ -24,54 +27,44 @@ st.markdown("""
 
 # === Constants ===
 LOG_FILE = "data/query_log.csv"
-API_URL = "https://openrouter.ai/api/v1/chat/completions"
 MODEL_NAME = "google/gemma-2-9b-it:free"
 OPENROUTER_API_KEY = st.secrets["OPENROUTER_API_KEY"]
-CSV_URL = "https://raw.githubusercontent.com/SheenaPatel23/Test/main/coa_assistant/data/chart_of_accounts.csv"
+INDEX_KIND = "auto"     # "flat" (exact), "hnsw" or "ivf" (approximate, for large/merged charts)
+PAGE_SIZE = 25          # matches fetched per "Show more" click
 
 # === Load Chart of Accounts ===
+@st.cache_data
 def load_data():
     try:
-        df = pd.read_csv(CSV_URL, encoding='utf-8')
-        df['combined'] = df['Shipsure Account Description'] + " - " + df['HFM Account Description']
+        df = coa_store.load_coa(CSV_PATH).df.copy()
+        df['combined'] = df['Shipsure Account Description'] + " - " + df['HFM Account Description'].astype(object)
         return df
     except Exception as e:
         st.error(f"❌ Error loading Chart of Accounts: {e}")
         return pd.DataFrame()
 
 # === Embed data ===
+# Embeddings and the FAISS index are persisted under model/ keyed by the CSV hash + model name,
+# so a cold start only re-encodes the chart when it has actually changed.
 @st.cache_resource
-def embed_data(df):
+def embed_data(_df, key):
     try:
-        model = SentenceTransformer('all-MiniLM-L6-v2')
-        sentences = df['combined'].fillna("").astype(str).tolist()
-        embeddings = model.encode(sentences, convert_to_tensor=False)
-        index = faiss.IndexFlatL2(len(embeddings[0]))
-        index.add(np.array(embeddings))
-        return model, index, embeddings
+        return load_or_build(combined_sentences(_df), model_name=DEFAULT_MODEL, kind=INDEX_KIND)
     except Exception as e:
         st.error(f"❌ Embedding error: {e}")
         return None, None, None
 
 # === Call OpenRouter LLM ===
 def ask_openrouter(prompt):
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-    }
-    body = {
-        "model": MODEL_NAME,
-        "messages": [
-            {"role": "system", "content": "You are a finance assistant helping users choose chart of account codes."},
-            {"role": "user", "content": prompt}
-        ],
-        "max_tokens": 300,
-        "temperature": 0.7,
-    }
+    messages = [
+        {"role": "system", "content": "You are a finance assistant helping users choose chart of account codes."},
+        {"role": "user", "content": prompt}
+    ]
     try:
-        response = requests.post(API_URL, headers=headers, json=body)
-        return response.json()["choices"][0]["message"]["content"].strip()
-    except:
+        return get_client("openrouter", OPENROUTER_API_KEY).complete(
+            MODEL_NAME, messages, temperature=0.7, max_tokens=300
+        )
+    except Exception:
         return "❌ Failed to get response."
 
 # === Log user query ===
@@ -91,7 +84,7 @@ def log_query(query, feedback, top_match):
 df = load_data()
 if df.empty:
     st.stop()
-model, index, embeddings = embed_data(df)
+model, index, embeddings = embed_data(df, index_key(CSV_PATH, DEFAULT_MODEL, INDEX_KIND))
 if model is None:
     st.stop()
 
@@ -119,13 +112,15 @@ account_number = st.selectbox(
 )
 
 # --- Apply Filters ---
-filtered_df = df.copy()
+# Hash-indexed lookups on the shared chart; df keeps the same row order, so positions line up
+criteria = {}
 if ship_desc != "All":
-    filtered_df = filtered_df[filtered_df['Shipsure Account Description'] == ship_desc]
+    criteria['Shipsure Account Description'] = ship_desc
 if hfm_desc != "All":
-    filtered_df = filtered_df[filtered_df['HFM Account Description'] == hfm_desc]
+    criteria['HFM Account Description'] = hfm_desc
 if account_number != "All":
-    filtered_df = filtered_df[filtered_df['Shipsure Account Number'].astype(str) == account_number]
+    criteria['Shipsure Account Number'] = account_number
+filtered_df = df.iloc[coa_store.load_coa(CSV_PATH).matching(criteria)] if criteria else df
 
 st.markdown(f"🔎 Showing **{len(filtered_df)}** matching records.")
 
@@ -161,21 +156,26 @@ st.download_button("⬇️ Download Excel", excel_data, file_name="chart_of_acco
 query = st.text_input("🧾 Describe the invoice or transaction you'd like to code:")
 if query:
     try:
-        q_embedding = model.encode([query])
-        D, I = index.search(np.array(q_embedding), k=len(df))  # search full dataset
+        # Only the requested number of matches is retrieved and rendered; more are fetched on demand
+        if st.session_state.get("match_query") != query:
+            st.session_state["match_query"] = query
+            st.session_state["match_k"] = PAGE_SIZE
+        k = st.session_state["match_k"]
+        scores, positions = search(model, index, query, k=k)
 
-        st.subheader("🔍 All Account Matches (Ranked by Relevance)")
+        st.subheader(f"🔍 Top {len(positions)} Account Matches (Ranked by Relevance)")
 
-        match_df = df.iloc[I[0]].copy()
-        match_df["Similarity Score"] = D[0]
-        match_df["Relevance"] = (1 - match_df["Similarity Score"]).round(3)
-        match_df = match_df.drop(columns=["combined"])
-        match_df = match_df[["Relevance"] + [col for col in match_df.columns if col != "Relevance"]]
+        match_df = df.iloc[positions].drop(columns=["combined"])
+        match_df.insert(0, "Relevance", np.round(scores, 3))  # cosine similarity, -1 to 1
 
         st.dataframe(match_df, use_container_width=True, height=450)
+        if len(positions) == k and k < len(df):
+            if st.button(f"⬇️ Show {PAGE_SIZE} more matches"):
+                st.session_state["match_k"] = k + PAGE_SIZE
+                st.rerun()
 
         # === LLM Recommendation ===
-        top_5_combined = df.iloc[I[0][:5]]["combined"].tolist()
+        top_5_combined = df.iloc[positions[:5]]["combined"].tolist()
         prompt = f"""User query: '{query}'
 
 Here are potential Chart of Account options:
@@ -0,0 +1,51 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repo root, for shared/
+from shared import embedding_index
+from shared.embedding_index import DEFAULT_MODEL, INDEX_KINDS, content_key, load_model, search
+
+# === Paths ===
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(APP_DIR, "model")
+CSV_PATH = os.path.join(APP_DIR, "data", "chart_of_accounts.csv")
+
+
+def index_key(csv_path=CSV_PATH, model_name=DEFAULT_MODEL, kind="auto"):
+    """Content hash of the chart CSV, the embedding model name and the index kind."""
+    with open(csv_path, "rb") as f:
+        return content_key(f.read(), model_name, f"ip:{kind}")
+
+
+def index_dir(key):
+    return os.path.join(MODEL_DIR, f"coa-{key}")
+
+
+def load_or_build(sentences, csv_path=CSV_PATH, model_name=DEFAULT_MODEL, kind="auto"):
+    """Load the saved index for this chart/model from model/, rebuilding only when the hash changed."""
+    key = index_key(csv_path, model_name, kind)
+    model = load_model(model_name, cache_folder=MODEL_DIR)
+    index, embeddings = embedding_index.load_or_build(sentences, model, index_dir(key), kind)
+    return model, index, embeddings
+
+
+def combined_sentences(df):
+    """Text that gets embedded for each account row."""
+    combined = df['Shipsure Account Description'] + " - " + df['HFM Account Description'].astype(object)
+    return combined.fillna("").astype(str).tolist()
+
+
+if __name__ == "__main__":
+    # Build step: `python index_store.py [auto|flat|hnsw|ivf]` to pre-build the index before deploying
+    from shared.coa_store import load_coa
+
+    kind = sys.argv[1] if len(sys.argv) > 1 else "auto"
+    if kind not in INDEX_KINDS:
+        sys.exit(f"Unknown index kind '{kind}', expected one of {INDEX_KINDS}")
+    df = load_coa(CSV_PATH).df
+    key = index_key(kind=kind)
+    if embedding_index.load_index(index_dir(key), expected_rows=len(df))[0] is not None:
+        print(f"✅ Index coa-{key} is up to date ({len(df)} rows)")
+    else:
+        load_or_build(combined_sentences(df), kind=kind)
+        print(f"✅ Built index coa-{key} ({len(df)} rows)")
@@ -1,26 +1,57 @@
+import os
+import sys
+import hashlib
 import streamlit as st
 import pandas as pd
-import requests
-import fitz  # PyMuPDF
-import io
+from batch_coding import code_lines, text_lines
 
-# === GitHub-hosted Chart of Accounts ===
-COA_URL = "https://raw.githubusercontent.com/SheenaPatel23/Test/main/invoice_coding_ai/Chart_of_Accounts.xlsx"
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repo root, for shared/
+from shared.llm_client import get_client
+from shared.pdf_tables import iter_pdf_tables, iter_pdf_text
+from shared import coa_store
+
+# === Chart of Accounts (bundled xlsx, compiled once to a memory-mapped Arrow file by the shared COA store) ===
+COA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Chart_of_Accounts.xlsx")
 
 # === Read API key from Streamlit secrets ===
 GROQ_API_KEY = st.secrets["GROQ_API_KEY"]
+GROQ_MODEL = "llama3-70b-8192"
+
+
+# === Groq chat call (pooled client with retries; repeated prompts come from the shared LLM cache) ===
+def ask_groq(prompt, temperature=0.3):
+    messages = [{"role": "user", "content": prompt}]
+    return get_client("groq", GROQ_API_KEY).complete(GROQ_MODEL, messages, temperature=temperature)
+
+
+# === Chunked JSON coding: every chunk request goes out concurrently through the shared client ===
+def ask_groq_json_many(batch):
+    return get_client("groq", GROQ_API_KEY).complete_many(
+        GROQ_MODEL, batch, temperature=0, response_format={"type": "json_object"}
+    )
+
+
+# === PDF extraction (cached per file, so reruns like typing a question don't re-parse it) ===
+@st.cache_data(show_spinner="Extracting PDF tables...")
+def extract_pdf(pdf_hash, _pdf_bytes):
+    # Tables are extracted page-parallel; text is only read for PDFs without tables
+    tables = list(iter_pdf_tables(_pdf_bytes))
+    if tables:
+        return pd.concat(tables, ignore_index=True), ""
+    return None, "\n".join(iter_pdf_text(_pdf_bytes))
+
 
 # === App title ===
 st.title("🧾 Invoice Coding AI with COA (Preloaded)")
 st.markdown("Upload your **invoice (CSV, Excel, PDF)** to get **AI-based coding recommendations** using the Chart of Accounts.")
 
-# === Load Chart of Accounts from GitHub ===
+# === Load Chart of Accounts ===
 try:
-    coa_df = pd.read_excel(COA_URL)
+    coa_df = coa_store.load_coa(COA_PATH).df
     st.subheader("📘 Preloaded Chart of Accounts")
     st.dataframe(coa_df.head(5000))
 except Exception as e:
-    st.error(f"Failed to load Chart of Accounts from GitHub: {e}")
+    st.error(f"Failed to load Chart of Accounts: {e}")
     st.stop()
 
 # === Upload Invoice File ===
@@ -35,10 +66,11 @@ if invoice_file:
         elif invoice_file.name.endswith(".xlsx"):
             df = pd.read_excel(invoice_file)
         elif invoice_file.name.endswith(".pdf"):
-            with fitz.open(stream=invoice_file.read(), filetype="pdf") as doc:
-                pdf_text = "\n".join(page.get_text() for page in doc)
-            st.subheader("📄 Extracted PDF Text")
-            st.text_area("PDF Content", pdf_text, height=300)
+            pdf_bytes = invoice_file.getvalue()
+            df, pdf_text = extract_pdf(hashlib.sha256(pdf_bytes).hexdigest(), pdf_bytes)
+            if df is None:
+                st.subheader("📄 Extracted PDF Text")
+                st.text_area("PDF Content", pdf_text, height=300)
         if df is not None:
             st.subheader("📊 Invoice Data Preview")
             st.dataframe(df.head(10))
@@ -47,69 +79,25 @@ if invoice_file:
         st.stop()
 
 # === Run AI Coding Recommendation ===
-ai_output = ""
+coded_df = None
 
 if (df is not None or pdf_text) and st.button("🔍 Generate AI Coding Recommendation"):
-    invoice_data = df.head(5000).to_markdown(index=False) if df is not None else pdf_text[:3000]
-    coa_sample = coa_df[['Shipsure Account Description', 'Shipsure Account Number']].dropna().head(20).to_markdown(index=False)
-
-    prompt = f"""
-You are a finance assistant. Based on the following invoice data and the Chart of Accounts (COA), recommend the most appropriate account code for each invoice line.
-
-Match using similarity between the **Invoice Line Description** and **Shipsure Account Description**.
-
-Return a table with:
-- Invoice Line Description
-- Suggested COA Code
-- Shipsure Account Description
-- Confidence Score (1-10)
-- Notes (reasoning or assumptions)
-
-Invoice Data:
-{invoice_data}
-
-Chart of Accounts:
-{coa_sample}
-"""
-
+    invoice_lines = df if df is not None else text_lines(pdf_text)
     try:
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {GROQ_API_KEY}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "llama3-70b-8192",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.3
-            }
-        )
-        result = response.json()
-
-        if response.status_code != 200:
-            st.error(f"Groq API Error {response.status_code}: {result}")
-        elif "choices" in result:
-            ai_output = result["choices"][0]["message"]["content"]
-            st.subheader("📥 AI-Coded Invoice Output")
-            st.markdown(f"```markdown\n{ai_output}\n```")
-        else:
-            st.error("Unexpected response format from Groq API.")
-            st.json(result)
-
+        with st.spinner(f"Coding {len(invoice_lines)} invoice lines..."):
+            coded_df = code_lines(invoice_lines, coa_df, ask_groq_json_many)
+        st.subheader("📥 AI-Coded Invoice Output")
+        st.dataframe(coded_df, use_container_width=True)
     except Exception as e:
         st.error(f"API call failed: {e}")
 
 # === Download Output ===
-if ai_output:
-    output_bytes = io.BytesIO()
-    output_bytes.write(ai_output.encode("utf-8"))
-    output_bytes.seek(0)
+if coded_df is not None:
     st.download_button(
-        label="⬇️ Download Output as .txt",
-        data=output_bytes,
-        file_name="invoice_coding_output.txt",
-        mime="text/plain"
+        label="⬇️ Download Output as .csv",
+        data=coded_df.to_csv(index=False).encode("utf-8"),
+        file_name="invoice_coding_output.csv",
+        mime="text/csv"
     )
 
 # === Optional Q&A Section ===
@@ -135,28 +123,7 @@ User Question:
 """
 
         try:
-            q_response = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {GROQ_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "llama3-70b-8192",
-                    "messages": [{"role": "user", "content": q_prompt}],
-                    "temperature": 0.3
-                }
-            )
-            q_result = q_response.json()
-
-            if q_response.status_code != 200:
-                st.error(f"Groq API Error {q_response.status_code}: {q_result}")
-            elif "choices" in q_result:
-                answer = q_result["choices"][0]["message"]["content"]
-                st.markdown(f"```markdown\n{answer}\n```")
-            else:
-                st.error("Unexpected response format from Groq API.")
-                st.json(q_result)
-
+            answer = ask_groq(q_prompt)
+            st.markdown(f"```markdown\n{answer}\n```")
         except Exception as e:
             st.error(f"Q&A failed: {e}")
@@ -0,0 +1,167 @@
+import re
+import json
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process, utils
+
+# === Budgets ===
+CHUNK_TOKEN_BUDGET = 3000   # prompt tokens per request (invoice lines + COA candidates)
+MAX_LINES_PER_CHUNK = 40
+CANDIDATES_PER_LINE = 8
+MAX_CANDIDATES_PER_CHUNK = 120
+CHARS_PER_TOKEN = 4         # rough estimate, good enough for budgeting
+
+DESCRIPTION_COLUMNS = ["Description", "Invoice Line Description", "Line Description", "Item", "Details"]
+RESULT_COLUMNS = ["Suggested COA Code", "Shipsure Account Description", "Confidence Score", "Notes"]
+
+SYSTEM_PROMPT = (
+    "You are a finance assistant that codes invoice lines to a Chart of Accounts. "
+    "Reply with JSON only."
+)
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def description_column(df):
+    """Best guess at the column holding the invoice line description."""
+    for col in DESCRIPTION_COLUMNS:
+        if col in df.columns:
+            return col
+    text_cols = [c for c in df.columns if pd.api.types.is_string_dtype(df[c]) or df[c].dtype == object]
+    if not text_cols:
+        return None
+    # Longest average text is usually the description
+    return max(text_cols, key=lambda c: df[c].astype(str).str.len().mean())
+
+
+def line_texts(df):
+    """One text per invoice line: the description, plus the other columns for context."""
+    desc_col = description_column(df)
+    if desc_col is None:
+        return df.astype(str).agg(" | ".join, axis=1).tolist()
+    return df[desc_col].fillna("").astype(str).str.strip().tolist()
+
+
+def text_lines(pdf_text):
+    """Treat each non-empty line of extracted PDF text as an invoice line."""
+    lines = [line.strip() for line in pdf_text.splitlines()]
+    return pd.DataFrame({"Description": [line for line in lines if line]})
+
+
+def candidate_codes(texts, coa_df, per_line=CANDIDATES_PER_LINE):
+    """Top COA rows for every line, scored in one rapidfuzz matrix: array of shape (lines, per_line)."""
+    choices = coa_df["Shipsure Account Description"].astype(str).tolist()
+    scores = process.cdist(texts, choices, scorer=fuzz.token_set_ratio,
+                           processor=utils.default_process, dtype=np.uint8, workers=-1)
+    per_line = min(per_line, len(choices))
+    return np.argpartition(scores, -per_line, axis=1)[:, -per_line:]
+
+
+def make_chunks(texts, candidates, token_budget=CHUNK_TOKEN_BUDGET):
+    """Group line ids so each chunk's lines + candidate COA rows fit the token budget."""
+    chunks, current, current_candidates, used = [], [], set(), 0
+    for line_id, text in enumerate(texts):
+        line_candidates = set(candidates[line_id].tolist()) - current_candidates
+        cost = estimate_tokens(text) + 12 * len(line_candidates) + 8
+        if current and (
+            used + cost > token_budget
+            or len(current) >= MAX_LINES_PER_CHUNK
+            or len(current_candidates) + len(line_candidates) > MAX_CANDIDATES_PER_CHUNK
+        ):
+            chunks.append((current, sorted(current_candidates)))
+            current, current_candidates, used = [], set(), 0
+            line_candidates = set(candidates[line_id].tolist())
+            cost = estimate_tokens(text) + 12 * len(line_candidates) + 8
+        current.append(line_id)
+        current_candidates |= line_candidates
+        used += cost
+    if current:
+        chunks.append((current, sorted(current_candidates)))
+    return chunks
+
+
+def chunk_messages(line_ids, texts, coa_rows):
+    lines = "\n".join(json.dumps({"line_id": i, "description": texts[i]}, ensure_ascii=False) for i in line_ids)
+    coa = "\n".join(
+        f"{row['Shipsure Account Number']} | {row['Shipsure Account Description']}"
+        for _, row in coa_rows.iterrows()
+    )
+    prompt = f"""Code each invoice line to the most appropriate account from the candidate Chart of Accounts.
+Match on similarity between the invoice line description and the Shipsure Account Description.
+
+Invoice lines (JSON, one per line):
+{lines}
+
+Candidate accounts (Shipsure Account Number | Shipsure Account Description):
+{coa}
+
+Return a JSON object of the form:
+{{"lines": [{{"line_id": <int>, "code": "<Shipsure Account Number>", "confidence": <1-10>, "notes": "<short reasoning>"}}]}}
+Include every line_id exactly once and only use codes from the candidate list."""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def parse_response(text):
+    """Pull the `lines` list out of a model reply, tolerating code fences and stray prose.
+
+    Raises ValueError when `lines` isn't a list; items that aren't objects are dropped.
+    """
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        raise ValueError("No JSON object in response")
+    data = json.loads(match.group(0))
+    lines = data.get("lines", []) if isinstance(data, dict) else []
+    if not isinstance(lines, list):
+        raise ValueError(f"Expected a list of lines, got {type(lines).__name__}")
+    return [item for item in lines if isinstance(item, dict)]
+
+
+def code_lines(df, coa_df, complete_many):
+    """Code every invoice line with chunked, concurrent JSON prompts and merge back into `df`.
+
+    `complete_many(list_of_messages) -> list[str | Exception]` sends all chunks at once.
+    """
+    coa_df = coa_df.dropna(subset=["Shipsure Account Description", "Shipsure Account Number"]).reset_index(drop=True)
+    coa_df["Shipsure Account Number"] = coa_df["Shipsure Account Number"].astype(str)
+    texts = line_texts(df)
+    candidates = candidate_codes(texts, coa_df)
+    chunks = make_chunks(texts, candidates)
+
+    batch = [chunk_messages(ids, texts, coa_df.iloc[rows]) for ids, rows in chunks]
+    replies = complete_many(batch) if batch else []
+
+    descriptions = dict(zip(coa_df["Shipsure Account Number"], coa_df["Shipsure Account Description"]))
+    results = {}
+    for (ids, rows), reply in zip(chunks, replies):
+        allowed = set(coa_df["Shipsure Account Number"].iloc[rows])
+        try:
+            if isinstance(reply, Exception):
+                raise reply
+            coded = parse_response(reply)
+        except Exception as e:
+            for i in ids:
+                results[i] = (None, None, None, f"Failed: {e}")
+            continue
+        for item in coded:
+            try:
+                line_id = int(item.get("line_id"))
+            except (TypeError, ValueError):
+                continue
+            if line_id not in ids:
+                continue
+            code = str(item.get("code", "")).strip()
+            note = str(item.get("notes", ""))
+            if code not in allowed:
+                note = f"Code {code or '?'} not in candidate list. {note}".strip()
+            results[line_id] = (code, descriptions.get(code), item.get("confidence"), note)
+
+    out = df.reset_index(drop=True).copy()
+    coded = [results.get(i, (None, None, None, "No suggestion returned")) for i in range(len(out))]
+    out[RESULT_COLUMNS] = pd.DataFrame(coded, columns=RESULT_COLUMNS)
+    return out
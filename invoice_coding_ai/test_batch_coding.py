@@ -0,0 +1,33 @@
+import re
+import json
+
+import pandas as pd
+
+from batch_coding import MAX_LINES_PER_CHUNK, code_lines
+
+COA = pd.DataFrame({
+    "Shipsure Account Number": ["5000", "6000"],
+    "Shipsure Account Description": ["Office supplies", "Travel expenses"],
+})
+MALFORMED = ['{"lines": [1, 2]}', '{"lines": "oops"}']
+
+
+def _line_ids(messages):
+    return [int(i) for i in re.findall(r'"line_id": (\d+)', messages[1]["content"].split("Candidate accounts")[0])]
+
+
+def test_malformed_replies_only_fail_their_own_chunk():
+    invoices = pd.DataFrame({"Description": ["office supplies"] * (MAX_LINES_PER_CHUNK * 3)})
+
+    def complete_many(batch):
+        # The first chunk codes properly; the others reply with a list of non-objects / a non-list
+        good = {"lines": [{"line_id": i, "code": "5000", "confidence": 9, "notes": "ok"} for i in _line_ids(batch[0])]}
+        return [json.dumps(good)] + [MALFORMED[i % 2] for i in range(len(batch) - 1)]
+
+    coded = code_lines(invoices, COA, complete_many)
+    first = coded.iloc[:MAX_LINES_PER_CHUNK]
+    assert (first["Suggested COA Code"] == "5000").all()
+    assert (first["Shipsure Account Description"] == "Office supplies").all()
+    rest = coded["Notes"].iloc[MAX_LINES_PER_CHUNK:]
+    assert rest.str.startswith("Failed:").any()
+    assert (rest.str.startswith("Failed:") | (rest == "No suggestion returned")).all()
@@ -1,10 +1,14 @@
 import streamlit as st
-import pandas as pd
-import yfinance as yf
 import plotly.express as px
 import matplotlib.pyplot as plt
-from datetime import datetime, timedelta
+from datetime import date, timedelta
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repo root, for shared/
+from shared.downsample import POINT_BUDGET, downsample_lines, window
 from utils import ask_llm
+from fx_store import FXStore
+from fx_analytics import analyze, summary_text
 
 # ---------------------- PAGE CONFIG ----------------------
 st.set_page_config(page_title="FX Trend Explorer", layout="wide")
@@ -36,7 +40,7 @@ days_lookup = {
     "5 Years": 1825
 }
 
-end_date = datetime.today()
+end_date = date.today()
 start_date = end_date - timedelta(days=days_lookup[date_range_option])
 
 if not to_currencies:
@@ -44,41 +48,43 @@ if not to_currencies:
     st.stop()
 
 # ---------------------- FETCH DATA ----------------------
-@st.cache_data(show_spinner=False)
-def fetch_fx_timeseries(from_cur, to_cur, start, end):
-    symbol = f"{from_cur}{to_cur}=X"
-    data = yf.download(symbol, start=start, end=end)
-
-    if data.empty or "Close" not in data.columns:
-        raise ValueError(f"No valid data for symbol {symbol}")
-
-    close_data = data["Close"]
-
-    # Squeeze to ensure it's 1D Series (sometimes yf returns DataFrame with one column)
-    if hasattr(close_data, "ndim") and close_data.ndim > 1:
-        close_data = close_data.squeeze()
-
-    if not isinstance(close_data, pd.Series):
-        raise ValueError(f"Close price data for {symbol} is not 1D")
-
-    close_data.name = to_cur
-    return close_data
+@st.cache_resource
+def get_fx_store():
+    # Rates persist under .cache/fx; only dates not yet stored are downloaded
+    return FXStore()
+
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def fetch_fx_matrix(from_cur, to_curs, start, end):
+    # Keyed on calendar dates, not datetimes, so reruns within a day hit the cache.
+    # Every pair is derived from stored USD rates, fetched in one batched call when missing.
+    return get_fx_store().cross_rates(from_cur, list(to_curs), start, end)
+
+try:
+    df = fetch_fx_matrix(from_currency, tuple(to_currencies), start_date, end_date)
+except Exception as e:
+    st.error(f"Error fetching FX data: {e}")
+    st.stop()
 
-fx_data = {}
-for to_cur in to_currencies:
-    try:
-        fx_data[to_cur] = fetch_fx_timeseries(from_currency, to_cur, start_date, end_date)
-    except Exception as e:
-        st.error(f"Error fetching data for {to_cur}: {e}")
+missing = [to_cur for to_cur in to_currencies if df[to_cur].isna().all()]
+if missing:
+    st.error(f"No valid data for: {', '.join(missing)}")
+df = df.drop(columns=missing)
 
-if not fx_data:
+if df.empty:
     st.warning("No FX data available for the selected currencies.")
     st.stop()
 
-df = pd.concat(fx_data.values(), axis=1)
-df.columns = fx_data.keys()
 df.index.name = "Date"
-df.dropna(inplace=True)
+df = df.dropna()
+
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def compute_fx_analytics(from_cur, to_curs, start, end, rates):
+    # Keyed on the same data version as fetch_fx_matrix (pair set + date window)
+    return analyze(rates)
+
+analytics = compute_fx_analytics(from_currency, tuple(df.columns), start_date, end_date, df)
 
 if normalize:
     df = df / df.iloc[0] * 100
@@ -86,7 +92,15 @@ if normalize:
 # ---------------------- PLOT SECTION ----------------------
 st.subheader("📈 FX Rate Trends")
 if chart_type == "Plotly":
-    fig = px.line(df, x=df.index, y=df.columns, labels={"value": "Rate", "index": "Date"}, title="FX Rate Over Time")
+    # Lines are reduced to the point budget (LTTB); narrowing the window brings back every day
+    visible = df
+    if len(df) * df.shape[1] > POINT_BUDGET:
+        first_day, last_day = df.index[0].date(), df.index[-1].date()
+        chart_window = st.slider("Chart window", min_value=first_day, max_value=last_day, value=(first_day, last_day))
+        visible = window(df, *chart_window)
+    plotted = downsample_lines(visible)
+    title = "FX Rate Over Time" if len(plotted) == len(visible) else f"FX Rate Over Time ({len(plotted)} of {len(visible)} days shown)"
+    fig = px.line(plotted, x=plotted.index, y=plotted.columns, labels={"value": "Rate", "index": "Date"}, title=title)
     st.plotly_chart(fig, use_container_width=True)
 else:
     plt.figure(figsize=(10, 4))
@@ -98,9 +112,27 @@ else:
     plt.legend()
     st.pyplot(plt)
 
+# ---------------------- ANALYTICS ----------------------
+st.subheader("📊 FX Analytics")
+summary_view = analytics.summary.copy()
+pct_cols = [c for c in summary_view.columns if c.startswith(("Return", "Volatility", "Max"))]
+st.dataframe(summary_view.style.format({c: "{:.2%}" for c in pct_cols}), use_container_width=True)
+
+col1, col2 = st.columns(2)
+with col1:
+    vol_fig = px.line(downsample_lines(analytics.rolling_vol.dropna(how="all")), labels={"value": "Annualised volatility", "variable": "Currency"}, title="Rolling 21-day Volatility")
+    st.plotly_chart(vol_fig, use_container_width=True)
+with col2:
+    if len(analytics.correlation) > 1:
+        corr_fig = px.imshow(analytics.correlation, text_auto=".2f", color_continuous_scale="RdBu", zmin=-1, zmax=1, title="Daily Return Correlation")
+        st.plotly_chart(corr_fig, use_container_width=True)
+    else:
+        dd_fig = px.area(downsample_lines(analytics.drawdown), labels={"value": "Drawdown", "variable": "Currency"}, title="Drawdown from Peak")
+        st.plotly_chart(dd_fig, use_container_width=True)
+
 # ---------------------- AI ASSISTANT ----------------------
 st.subheader("🤖 Ask AI about FX Trends")
-fx_summary = df.tail(5).to_string()
+fx_summary = summary_text(analytics, from_currency)
 user_question = st.text_input("What would you like to ask?", placeholder="e.g., Which currency gained the most recently?")
 if user_question:
     with st.spinner("Asking AI..."):
@@ -0,0 +1,62 @@
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+VOL_WINDOW = 21   # ~1 trading month
+PERIODS = {"1W": 5, "1M": 21, "3M": 63, "1Y": 252}
+
+
+class FXAnalytics(NamedTuple):
+    returns: pd.DataFrame          # daily log returns
+    rolling_vol: pd.DataFrame      # annualised rolling volatility
+    correlation: pd.DataFrame      # pairwise correlation of daily returns
+    drawdown: pd.DataFrame         # distance below the running peak
+    summary: pd.DataFrame          # one row per currency
+
+
+def analyze(rates, window=VOL_WINDOW):
+    """Returns, volatility, correlation and drawdown for every column of a rate matrix at once."""
+    values = rates.to_numpy(dtype=np.float64)
+    log_rates = np.log(values)
+    returns = pd.DataFrame(np.diff(log_rates, axis=0, prepend=np.nan), index=rates.index, columns=rates.columns)
+
+    rolling_vol = returns.rolling(window, min_periods=max(2, window // 2)).std() * np.sqrt(TRADING_DAYS)
+    correlation = returns.corr()
+
+    peaks = np.fmax.accumulate(values, axis=0)
+    drawdown = pd.DataFrame(values / peaks - 1, index=rates.index, columns=rates.columns)
+
+    last = values[-1]
+    summary = pd.DataFrame(index=rates.columns)
+    summary["Last"] = last
+    for label, days in PERIODS.items():
+        if len(values) > days:
+            summary[f"Return {label}"] = last / values[-1 - days] - 1
+    summary["Return (range)"] = last / values[0] - 1
+    summary["Volatility (ann.)"] = returns.std().to_numpy() * np.sqrt(TRADING_DAYS)
+    summary["Max drawdown"] = drawdown.min().to_numpy()
+    summary["High"] = np.nanmax(values, axis=0)
+    summary["Low"] = np.nanmin(values, axis=0)
+    return FXAnalytics(returns, rolling_vol, correlation, drawdown, summary)
+
+
+def summary_text(analytics, base):
+    """Compact statistical context for the LLM, in place of raw rate rows."""
+    summary = analytics.summary
+    pct = [c for c in summary.columns if c.startswith(("Return", "Volatility", "Max"))]
+    table = summary.copy()
+    table[pct] = (table[pct] * 100).round(2)
+    table = table.round(4)
+
+    lines = [f"Base currency: {base}. Returns, volatility and drawdown are in %.", table.to_string()]
+    correlation = analytics.correlation
+    if len(correlation) > 1:
+        pairs = correlation.where(np.triu(np.ones(correlation.shape, dtype=bool), k=1)).stack()
+        if len(pairs):
+            strongest = pairs.abs().sort_values(ascending=False).index[:5]
+            lines.append("Strongest daily-return correlations: " + ", ".join(
+                f"{a}/{b} {pairs[(a, b)]:.2f}" for a, b in strongest
+            ))
+    return "\n".join(lines)
@@ -0,0 +1,181 @@
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repo root, for shared/
+from shared.span_store import SpanStore, day
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_DIR = os.path.join(REPO_ROOT, ".cache", "fx")
+RECENT_SECONDS = 15 * 60  # uncovered ranges (today, empty fetches) aren't asked for again within this
+
+
+# === Sources ===
+
+class YahooSource:
+    """Daily closes from yfinance (the `{FROM}{TO}=X` tickers)."""
+
+    def fetch(self, from_cur, to_cur, start, end):
+        import yfinance as yf
+
+        symbol = f"{from_cur}{to_cur}=X"
+        # yfinance treats `end` as exclusive
+        data = yf.download(symbol, start=start, end=end + timedelta(days=1), progress=False, auto_adjust=False)
+        if data.empty or "Close" not in data.columns:
+            return pd.Series(dtype="float64")
+        close = data["Close"]
+        if close.ndim > 1:
+            close = close.squeeze(axis=1)
+        return close
+
+    def fetch_many(self, from_cur, to_curs, start, end):
+        """All pairs in one yf.download call; returns a frame with one column per target currency."""
+        import yfinance as yf
+
+        symbols = {f"{from_cur}{to_cur}=X": to_cur for to_cur in to_curs}
+        data = yf.download(
+            list(symbols), start=start, end=end + timedelta(days=1),
+            progress=False, auto_adjust=False, group_by="column", threads=True,
+        )
+        if data.empty or "Close" not in data.columns.get_level_values(0):
+            return pd.DataFrame(columns=list(to_curs), dtype="float64")
+        close = data["Close"]
+        if isinstance(close, pd.Series):
+            close = close.to_frame(next(iter(symbols)))
+        return close.rename(columns=symbols)
+
+
+class CSVSource:
+    """Reads `{FROM}{TO}.csv` files (Date, Close) from a directory; a drop-in offline/test source."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def fetch(self, from_cur, to_cur, start, end):
+        path = os.path.join(self.directory, f"{from_cur}{to_cur}.csv")
+        if not os.path.exists(path):
+            return pd.Series(dtype="float64")
+        close = pd.read_csv(path, index_col="Date", parse_dates=True)["Close"]
+        return close.loc[pd.Timestamp(start):pd.Timestamp(end)]
+
+
+def fetch_many(source, from_cur, to_curs, start, end, max_workers=8):
+    """One batched call when the source supports it, else one thread per pair."""
+    if hasattr(source, "fetch_many"):
+        return source.fetch_many(from_cur, list(to_curs), start, end)
+    if not to_curs:
+        return pd.DataFrame(dtype="float64")
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        series = pool.map(lambda to_cur: source.fetch(from_cur, to_cur, start, end).rename(to_cur), to_curs)
+        return pd.concat(list(series), axis=1)
+
+
+# === Store ===
+
+class FXStore:
+    """Daily FX closes persisted per pair as Parquet, topped up with only the missing date range.
+
+    Coverage is tracked by the shared SpanStore: any window inside the span already fetched
+    is served from disk, and empty fetches are asked for again.
+    """
+
+    def __init__(self, source=None, root=STORE_DIR):
+        self.source = source or YahooSource()
+        self.spans = SpanStore(root)
+        self._lock = threading.Lock()
+        self._loaded = {}  # (from, to) -> (rates, covered_start, covered_end)
+        self._recent = {}  # (from, to) -> [(gap_start, gap_end, fetched_at)], kept in memory only
+
+    def _read(self, from_cur, to_cur):
+        """(rates, covered_start, covered_end); empty rates and None bounds when nothing is stored."""
+        frame, covered_start, covered_end = self.spans.read(f"{from_cur}{to_cur}")
+        if frame is None:
+            return pd.Series(dtype="float64", name="Close"), None, None
+        return frame["Close"], covered_start, covered_end
+
+    def _load(self, from_cur, to_cur):
+        """Stored pair from memory, reading its file the first time it's needed."""
+        key = (from_cur, to_cur)
+        if key not in self._loaded:
+            self._loaded[key] = self._read(from_cur, to_cur)
+        return self._loaded[key]
+
+    @staticmethod
+    def _clean(rates):
+        rates = pd.Series(rates, dtype="float64").dropna()
+        rates.index = pd.DatetimeIndex(rates.index).tz_localize(None).normalize()
+        return rates[~rates.index.duplicated(keep="last")]
+
+    def _fetched_recently(self, from_cur, to_cur, gap):
+        """True when `gap` was asked of the source in the last RECENT_SECONDS (by this process)."""
+        now = time.monotonic()
+        spans = [s for s in self._recent.get((from_cur, to_cur), []) if now - s[2] < RECENT_SECONDS]
+        self._recent[(from_cur, to_cur)] = spans
+        return any(a <= gap[0] and gap[1] <= b for a, b, _ in spans)
+
+    def _merge(self, from_cur, to_cur, fetched):
+        """Fold freshly fetched closes into the stored pair and persist the widened span."""
+        stored, covered_start, covered_end = self._load(from_cur, to_cur)
+        fetched = [(gap, rates.rename("Close")) for gap, rates in fetched]
+        merged = self.spans.merge(f"{from_cur}{to_cur}", stored, covered_start, covered_end, fetched)
+        self._loaded[(from_cur, to_cur)] = merged
+        return merged[0]
+
+    def rates(self, from_cur, to_cur, start, end):
+        """Daily closes for the pair between `start` and `end` (inclusive), named `to_cur`."""
+        return self.rates_many(from_cur, [to_cur], start, end)[to_cur].dropna()
+
+    def rates_many(self, from_cur, to_curs, start, end):
+        """Closes for several pairs as one frame (a column per target currency).
+
+        Pairs missing the same date range are fetched together in a single batched call.
+        """
+        start, end = day(start), day(end)
+        to_curs = list(dict.fromkeys(to_curs))
+        with self._lock:
+            by_gap = {}
+            for to_cur in to_curs:
+                _, covered_start, covered_end = self._load(from_cur, to_cur)
+                for gap in SpanStore.missing(covered_start, covered_end, start, end):
+                    # Today's close is never covered; a base switch shouldn't re-download it
+                    if not self._fetched_recently(from_cur, to_cur, gap):
+                        by_gap.setdefault(gap, []).append(to_cur)
+
+            fetched = {to_cur: [] for to_cur in to_curs}
+            for (a, b), targets in by_gap.items():
+                frame = fetch_many(self.source, from_cur, targets, a, b)
+                fetched_at = time.monotonic()
+                for to_cur in targets:
+                    self._recent.setdefault((from_cur, to_cur), []).append((a, b, fetched_at))
+                    rates = frame[to_cur] if to_cur in frame.columns else pd.Series(dtype="float64")
+                    fetched[to_cur].append(((a, b), self._clean(rates)))
+
+            touched = {to_cur for targets in by_gap.values() for to_cur in targets}
+            columns = {}
+            for to_cur in to_curs:
+                if to_cur in touched:
+                    stored = self._merge(from_cur, to_cur, fetched[to_cur])
+                else:
+                    stored = self._load(from_cur, to_cur)[0]
+                columns[to_cur] = stored.loc[pd.Timestamp(start):pd.Timestamp(end)]
+        frame = pd.DataFrame(columns, columns=to_curs)
+        frame.index.name = "Date"
+        return frame
+
+    def cross_rates(self, base, targets, start, end, pivot="USD"):
+        """base->target closes derived from stored pivot->currency rates.
+
+        Only `pivot` pairs are ever downloaded: with USD->EUR and USD->GBP stored, EUR->GBP is
+        USD->GBP / USD->EUR, so changing the base currency needs no new download.
+        """
+        needed = [c for c in dict.fromkeys([base, *targets]) if c != pivot]
+        usd = self.rates_many(pivot, needed, start, end)
+        usd[pivot] = 1.0
+        usd = usd.dropna(how="all", subset=needed) if needed else usd
+        crosses = usd[list(targets)].div(usd[base], axis=0)
+        return crosses.dropna(how="all")
@@ -0,0 +1,28 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from fx_store import FXStore
+
+
+class DailySource:
+    """Weekday closes for any pair, recording every call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def fetch(self, from_cur, to_cur, start, end):
+        self.calls.append((to_cur, start, end))
+        days = pd.bdate_range(start, end)
+        return pd.Series(np.linspace(1.0, 2.0, len(days)), index=days)
+
+
+def test_base_switch_does_not_refetch_today(tmp_path):
+    source = DailySource()
+    store = FXStore(source, root=str(tmp_path))
+    start, end = date.today() - timedelta(days=30), date.today()
+    store.cross_rates("USD", ["EUR", "GBP"], start, end)
+    calls = len(source.calls)
+    store.cross_rates("EUR", ["USD", "GBP"], start, end)
+    assert len(source.calls) == calls
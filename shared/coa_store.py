@@ -0,0 +1,158 @@
+import os
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(REPO_ROOT, ".cache", "coa")
+DEFAULT_SOURCE = os.path.join(REPO_ROOT, "coa_assistant", "data", "chart_of_accounts.csv")
+
+# Low-cardinality columns become categoricals (dictionary-encoded in the Arrow file)
+CATEGORICAL_COLUMNS = ["Level", "Account Type", "HFM Account Number", "HFM Account Description"]
+KEY_COLUMNS = ["Shipsure Account Number", "HFM Account Number"]
+
+_lock = threading.Lock()
+_loaded = {}  # (source path, content hash) -> ChartOfAccounts, shared by every session in the process
+
+
+def source_hash(source):
+    with open(source, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def _as_key(value):
+    """Account numbers as strings, whether Excel gave us 1100100, 1100100.0 or "1100100"."""
+    if pd.isna(value):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def read_source(source):
+    """Parse the raw CSV/xlsx chart and normalise its dtypes."""
+    if source.endswith((".xlsx", ".xls")):
+        df = pd.read_excel(source)
+    else:
+        df = pd.read_csv(source, encoding="utf-8")
+    df = df.loc[:, ~df.columns.astype(str).str.startswith("Unnamed")]
+    df = df.dropna(how="all").reset_index(drop=True)
+    for col in KEY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].map(_as_key).astype(object)
+    # Excel sometimes types a stray cell as a number; keep text columns uniformly str
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].map(lambda v: None if pd.isna(v) else str(v)).astype(object)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def compile_coa(source, cache_dir=CACHE_DIR):
+    """Compile `source` to an uncompressed Arrow IPC file named by its content hash; returns the path."""
+    # Prefix is unique per source path, so different apps' charts never evict each other
+    path_tag = hashlib.sha256(os.path.abspath(source).encode("utf-8")).hexdigest()[:8]
+    name = f"{os.path.splitext(os.path.basename(source))[0]}-{path_tag}"
+    target = os.path.join(cache_dir, f"{name}-{source_hash(source)}.arrow")
+    if os.path.exists(target):
+        return target
+    os.makedirs(cache_dir, exist_ok=True)
+    table = pa.Table.from_pandas(read_source(source), preserve_index=False)
+    tmp = f"{target}.tmp-{os.getpid()}"
+    feather.write_feather(table, tmp, compression="uncompressed")
+    os.replace(tmp, target)
+    # Drop files compiled from older versions of the same chart
+    for other in os.listdir(cache_dir):
+        if other.startswith(f"{name}-") and other.endswith(".arrow") and other != os.path.basename(target):
+            os.remove(os.path.join(cache_dir, other))
+    return target
+
+
+def read_compiled(path):
+    """Memory-map a compiled chart; dictionary columns come back as pandas categoricals."""
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas()
+
+
+# Columns with a hash index: value -> row positions, built once per loaded chart
+INDEXED_COLUMNS = [
+    "Shipsure Account Description", "Shipsure Account Number",
+    "HFM Account Number", "HFM Account Description",
+]
+
+
+class ChartOfAccounts:
+    """A loaded chart plus hash indexes from account numbers / descriptions to row positions.
+
+    Single lookups are dict hits instead of boolean-mask scans, and whole batches of invoice
+    lines resolve with one join via `bulk_lookup`.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._positions = {
+            col: df.groupby(col, observed=True, sort=False).indices
+            for col in INDEXED_COLUMNS if col in df.columns
+        }
+        self._first = {
+            col: df.drop_duplicates(col).dropna(subset=[col]).set_index(col)
+            for col in self._positions
+        }
+        self.by_number = {k: int(v[0]) for k, v in self._positions.get("Shipsure Account Number", {}).items()}
+        self.by_description = {k: int(v[0]) for k, v in self._positions.get("Shipsure Account Description", {}).items()}
+
+    def __len__(self):
+        return len(self.df)
+
+    def positions(self, column, value):
+        """Row positions where `column == value` (empty if none)."""
+        return self._positions[column].get(value, _EMPTY)
+
+    def row(self, column, value):
+        """First row where `column == value`, as a Series, or None."""
+        found = self.positions(column, value)
+        return self.df.iloc[found[0]] if len(found) else None
+
+    def by(self, description=None, number=None, hfm_number=None):
+        """First row matching a Shipsure description, Shipsure number or HFM number."""
+        if description is not None:
+            return self.row("Shipsure Account Description", description)
+        if number is not None:
+            return self.row("Shipsure Account Number", str(number))
+        if hfm_number is not None:
+            return self.row("HFM Account Number", str(hfm_number))
+        return None
+
+    def matching(self, criteria):
+        """Sorted row positions matching every {column: value} pair, by intersecting index hits."""
+        found = np.arange(len(self.df))
+        for column, value in criteria.items():
+            found = np.intersect1d(found, self.positions(column, value), assume_unique=True)
+        return found
+
+    def filter(self, criteria):
+        """Rows matching every {column: value} pair, without full-column scans."""
+        return self.df.iloc[self.matching(criteria)]
+
+    def bulk_lookup(self, values, column="Shipsure Account Description"):
+        """First chart row for each value, aligned with `values` (NaN where unmatched): one hash join."""
+        return self._first[column].reindex(pd.Index(values, name=column)).reset_index()
+
+
+_EMPTY = np.array([], dtype=np.intp)
+
+
+def load_coa(source=DEFAULT_SOURCE, cache_dir=CACHE_DIR):
+    """Chart of Accounts for `source`, compiled once and reused until the file's content changes."""
+    source = os.path.abspath(source)
+    key = (source, source_hash(source))
+    with _lock:
+        if key not in _loaded:
+            _loaded[key] = ChartOfAccounts(read_compiled(compile_coa(source, cache_dir)))
+        return _loaded[key]
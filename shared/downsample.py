@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+POINT_BUDGET = 1500   # points per trace sent to the browser; about one per horizontal pixel
+# Bar sizes tried in order until a window fits the budget
+BAR_RULES = (("daily", None), ("weekly", "W-FRI"), ("monthly", "ME"), ("quarterly", "QE"), ("yearly", "YE"))
+_BAR_AGG = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+
+def window(data, start=None, end=None):
+    """Rows of a date-indexed frame or series between `start` and `end` (inclusive)."""
+    return data.loc[pd.Timestamp(start) if start else None:pd.Timestamp(end) if end else None]
+
+
+# === Lines ===
+
+def lttb_indices(x, y, budget):
+    """Positions kept by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept; every bucket in between keeps the point that
+    spans the largest triangle with the previous pick and the next bucket's average, so peaks
+    and troughs survive where plain striding would drop them.
+    """
+    n = len(x)
+    if budget >= n or budget < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, budget - 1).astype(np.int64)
+    sizes = np.diff(edges)
+    # Every bucket's average in one pass; the last bucket looks ahead to the final point
+    avg_x = np.append(np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / sizes, x[-1])
+    avg_y = np.append(np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / sizes, y[-1])
+
+    keep = np.empty(budget, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(budget - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def _x_values(index):
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8.astype(np.float64)
+    return np.asarray(index, dtype=np.float64)
+
+
+def lttb(series, budget=POINT_BUDGET):
+    """A line series reduced to at most `budget` points (gaps dropped), keeping its visual shape."""
+    series = series.dropna()
+    if len(series) <= budget:
+        return series
+    return series.iloc[lttb_indices(_x_values(series.index), series.to_numpy(), budget)]
+
+
+def downsample_lines(frame, budget=POINT_BUDGET):
+    """Wide frame (a line per column) reduced to roughly `budget` points across all lines.
+
+    Each column keeps its own LTTB picks out of an equal share of the budget, and the frame
+    keeps the union of those rows, so every line stays faithful while sharing one x axis.
+    """
+    lines = max(1, frame.shape[1])
+    if len(frame) * lines <= budget:
+        return frame
+    x = _x_values(frame.index)
+    share = max(3, budget // lines)
+    keep = set()
+    for column in frame.columns:
+        values = frame[column].to_numpy(dtype=np.float64)
+        valid = np.flatnonzero(np.isfinite(values))
+        keep.update(valid[lttb_indices(x[valid], values[valid], share)].tolist())
+    return frame.iloc[sorted(keep)]
+
+
+# === Bars ===
+
+def bar_rule(index, budget=POINT_BUDGET):
+    """(label, pandas rule) of the finest bar size that fits `index` into `budget` bars."""
+    if len(index) <= budget:
+        return BAR_RULES[0]
+    span_days = max((index[-1] - index[0]).days, 1)
+    per_year = {"weekly": 52, "monthly": 12, "quarterly": 4, "yearly": 1}
+    for label, rule in BAR_RULES[1:]:
+        if span_days / 365.25 * per_year[label] <= budget:
+            return label, rule
+    return BAR_RULES[-1]
+
+
+def resample_bars(bars, budget=POINT_BUDGET):
+    """OHLCV bars coarsened to the finest bar size that fits the budget; returns (bars, label).
+
+    Open/High/Low/Close become first/max/min/last and Volume is summed per bucket, so
+    candlesticks and volume bars resampled with the same budget line up.
+    """
+    label, rule = bar_rule(bars.index, budget)
+    if rule is None:
+        return bars, label
+    agg = {c: _BAR_AGG[c] for c in bars.columns if c in _BAR_AGG}
+    resampled = bars.resample(rule).agg(agg)
+    # Buckets with no trading days (e.g. a market holiday week) have no price at all
+    priced = [c for c in ("Open", "High", "Low", "Close") if c in agg]
+    return resampled.dropna(how="all", subset=priced or None), label
@@ -0,0 +1,145 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import faiss
+from sentence_transformers import SentenceTransformer
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+# "flat" is exact; "hnsw" / "ivf" are approximate and meant for large or merged charts.
+# "auto" stays exact until the chart grows past APPROX_THRESHOLD rows.
+INDEX_KINDS = ("auto", "flat", "hnsw", "ivf")
+APPROX_THRESHOLD = 50_000
+HNSW_M = 32
+
+INDEX_FILE = "index.faiss"
+EMBEDDINGS_FILE = "embeddings.npy"
+META_FILE = "meta.json"
+
+
+def content_key(*parts):
+    """Short sha256 over bytes/str parts, used to name on-disk indexes."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def load_model(model_name=DEFAULT_MODEL, cache_folder=None):
+    """Load the sentence-transformer, optionally keeping its weights in `cache_folder`."""
+    return SentenceTransformer(model_name, cache_folder=cache_folder)
+
+
+def _read_index(path):
+    # Memory-map the index where the faiss build supports it for this index type
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        return faiss.read_index(path)
+
+
+def resolve_kind(kind, rows):
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown index kind '{kind}', expected one of {INDEX_KINDS}")
+    if kind == "auto":
+        return "hnsw" if rows > APPROX_THRESHOLD else "flat"
+    return kind
+
+
+def make_index(embeddings, kind="auto"):
+    """Inner-product index over L2-normalised embeddings, so scores are cosine similarities."""
+    rows, dim = embeddings.shape
+    kind = resolve_kind(kind, rows)
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    elif kind == "ivf":
+        nlist = max(1, int(np.sqrt(rows)))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatIP(dim), dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+    else:
+        index = faiss.IndexFlatIP(dim)
+    index.add(embeddings)
+    return index
+
+
+def encode(model, sentences):
+    """Encode to contiguous, L2-normalised float32 vectors."""
+    vectors = model.encode(sentences, convert_to_tensor=False, show_progress_bar=False)
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def search_many(model, index, queries, k=10):
+    """Top-k cosine matches for a batch of queries: (scores, row positions), each (len(queries), k).
+
+    Approximate indexes pad with -1 when fewer than k neighbours are found.
+    """
+    k = max(1, min(k, index.ntotal))
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = max(index.hnsw.efSearch, 2 * k)
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = max(index.nprobe, min(index.nlist, 16))
+    return index.search(encode(model, queries), k)
+
+
+def search(model, index, query, k=10):
+    """Top-k cosine matches for a query: returns (scores, row positions)."""
+    D, I = search_many(model, index, [query], k)
+    keep = I[0] >= 0
+    return D[0][keep], I[0][keep]
+
+
+def build_index(sentences, model, index_dir, kind="auto"):
+    """Encode all sentences and save embeddings + FAISS index to `index_dir`."""
+    embeddings = encode(model, sentences)
+    index = make_index(embeddings, kind)
+
+    # Write to a temp dir first so a crashed build never leaves a half-written index behind
+    tmp = f"{index_dir}.tmp-{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+    np.save(os.path.join(tmp, EMBEDDINGS_FILE), embeddings)
+    faiss.write_index(index, os.path.join(tmp, INDEX_FILE))
+    with open(os.path.join(tmp, META_FILE), "w") as f:
+        json.dump({"key": os.path.basename(index_dir), "rows": len(sentences),
+                   "dim": int(embeddings.shape[1]), "kind": resolve_kind(kind, len(sentences)),
+                   "metric": "inner_product"}, f)
+    if os.path.isdir(index_dir):
+        shutil.rmtree(index_dir)
+    os.replace(tmp, index_dir)
+    return index, embeddings
+
+
+def prune_stale(index_dir):
+    """Remove sibling indexes with the same name prefix, built for older data/model versions."""
+    parent, keep = os.path.split(index_dir)
+    prefix = keep.rsplit("-", 1)[0] + "-"
+    for name in os.listdir(parent):
+        if name.startswith(prefix) and name != keep:
+            shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+
+
+def load_index(index_dir, expected_rows=None):
+    """Return (index, embeddings) from disk, or (None, None) if missing or stale."""
+    try:
+        with open(os.path.join(index_dir, META_FILE)) as f:
+            meta = json.load(f)
+        if expected_rows is not None and meta.get("rows") != expected_rows:
+            return None, None
+        index = _read_index(os.path.join(index_dir, INDEX_FILE))
+        embeddings = np.load(os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode="r")
+        return index, embeddings
+    except (OSError, ValueError, RuntimeError):
+        return None, None
+
+
+def load_or_build(sentences, model, index_dir, kind="auto"):
+    """Load the index saved in `index_dir`, building (and pruning older versions) only if missing."""
+    index, embeddings = load_index(index_dir, expected_rows=len(sentences))
+    if index is None:
+        index, embeddings = build_index(sentences, model, index_dir, kind)
+        prune_stale(index_dir)
+    return index, embeddings
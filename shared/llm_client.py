@@ -0,0 +1,334 @@
+import json
+import time
+import queue
+import random
+import asyncio
+import threading
+from functools import lru_cache
+
+import httpx
+
+from shared.llm_cache import cache_key, get_cache
+from shared.llm_metrics import get_latency_log
+
+# === Providers (OpenAI-compatible chat endpoints) ===
+# requests_per_minute feeds a token bucket shared by every client talking to that provider.
+PROVIDERS = {
+    "groq": {"base_url": "https://api.groq.com/openai/v1", "requests_per_minute": 30},
+    "openrouter": {"base_url": "https://openrouter.ai/api/v1", "requests_per_minute": 20},
+}
+
+MAX_CONCURRENCY = 8
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5   # seconds, doubled per attempt
+BACKOFF_CAP = 30.0
+TIMEOUT = 30.0
+RETRY_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class LLMError(RuntimeError):
+    """A completion failed for good: non-retryable status, bad payload, or retries exhausted."""
+
+
+class TokenBucket:
+    """Async token bucket: `rate` requests per second with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def penalise(self, seconds):
+        """Drain the bucket after a 429 so every request to the provider backs off together."""
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+# === Background event loop ===
+# Streamlit scripts are synchronous, so every client shares one loop running in a daemon thread.
+# The pooled httpx session, semaphores and buckets all live on that loop.
+_loop = None
+_loop_lock = threading.Lock()
+_buckets = {}
+
+
+def _background_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-client-loop", daemon=True).start()
+    return _loop
+
+
+def _bucket(provider, requests_per_minute):
+    if provider not in _buckets:
+        _buckets[provider] = TokenBucket(requests_per_minute / 60.0)
+    return _buckets[provider]
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff, or the server's Retry-After when it sent one."""
+    if retry_after is not None:
+        return retry_after
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers["retry-after"])
+    except (KeyError, ValueError):
+        return None
+
+
+def sse_delta(line):
+    """(served model, text) from one server-sent event line; None for comments, keep-alives and [DONE]."""
+    if not line.startswith("data:"):
+        return None
+    data = line[5:].strip()
+    if not data or data == "[DONE]":
+        return None
+    try:
+        chunk = json.loads(data)
+    except ValueError as e:
+        raise LLMError(f"Unexpected stream event: {data[:500]}") from e
+    if "error" in chunk:
+        raise LLMError(f"Stream error: {chunk['error']}")
+    choices = chunk.get("choices") or [{}]
+    return chunk.get("model"), (choices[0].get("delta") or {}).get("content") or ""
+
+
+_DONE = object()
+
+
+class LLMClient:
+    """Pooled, rate-limited, retrying client for OpenAI-compatible chat completions.
+
+    Point `base_url` at a local fake server to exercise it in tests; pass `cache=None` to skip
+    caching and `metrics=None` to skip latency logging.
+    """
+
+    def __init__(self, provider="groq", api_key=None, base_url=None, requests_per_minute=None,
+                 max_concurrency=MAX_CONCURRENCY, max_retries=MAX_RETRIES, timeout=TIMEOUT,
+                 cache="default", headers=None, metrics="default"):
+        config = PROVIDERS.get(provider, {})
+        self.provider = provider
+        self.base_url = (base_url or config["base_url"]).rstrip("/")
+        self.max_retries = max_retries
+        self.cache = get_cache() if cache == "default" else cache
+        self.metrics = get_latency_log() if metrics == "default" else metrics
+        self._headers = {"Content-Type": "application/json", **(headers or {})}
+        if api_key:
+            self._headers["Authorization"] = f"Bearer {api_key}"
+        self._timeout = timeout
+        self._max_concurrency = max_concurrency
+        self._rpm = requests_per_minute or config.get("requests_per_minute", 60)
+        self._http = None
+        self._semaphore = None
+
+    # --- async API ---
+    async def _session(self):
+        if self._http is None:
+            limits = httpx.Limits(max_connections=self._max_concurrency,
+                                  max_keepalive_connections=self._max_concurrency)
+            self._http = httpx.AsyncClient(base_url=self.base_url, headers=self._headers,
+                                           timeout=self._timeout, limits=limits)
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._http
+
+    def _record(self, model, started, first, chars, ok):
+        if self.metrics is not None:
+            now = time.monotonic()
+            self.metrics.record(self.provider, model, first and first - started, now - started, chars, ok)
+
+    def _cached(self, model, messages, temperature, params):
+        """(cache key, cached text); the key is None when the request mustn't be cached."""
+        if self.cache is None or not self.cache.cacheable(temperature):
+            return None, None
+        key = cache_key(model, messages, temperature, **params)
+        return key, self.cache.get(key)
+
+    async def _post(self, payload):
+        started = time.monotonic()
+        try:
+            text = await self._post_once(payload)
+        except LLMError:
+            self._record(payload["model"], started, None, 0, ok=False)
+            raise
+        self._record(payload["model"], started, None, len(text), ok=True)
+        return text
+
+    async def _post_once(self, payload):
+        http = await self._session()
+        bucket = _bucket(self.provider, self._rpm)
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                await bucket.acquire()
+                try:
+                    response = await http.post("/chat/completions", json=payload)
+                except httpx.TransportError as e:
+                    error, retry_after = e, None
+                else:
+                    if response.status_code == 200:
+                        try:
+                            return response.json()["choices"][0]["message"]["content"].strip()
+                        except (ValueError, KeyError, IndexError) as e:
+                            raise LLMError(f"Unexpected response format: {response.text[:500]}") from e
+                    if response.status_code not in RETRY_STATUSES:
+                        raise LLMError(f"API Error {response.status_code}: {response.text[:500]}")
+                    error, retry_after = f"API Error {response.status_code}", _retry_after(response)
+                    if response.status_code == 429:
+                        bucket.penalise(retry_after or 1.0)
+            if attempt < self.max_retries:
+                await asyncio.sleep(backoff_delay(attempt, retry_after))
+        raise LLMError(f"Gave up after {self.max_retries + 1} attempts: {error}")
+
+    async def acomplete(self, model, messages, temperature=None, **params):
+        """Completion text for one chat request, served from the LLM cache when allowed."""
+        payload = {"model": model, "messages": messages, **params}
+        if temperature is not None:
+            payload["temperature"] = temperature
+        key, cached = self._cached(model, messages, temperature, params)
+        if cached is not None:
+            return cached
+        text = await self._post(payload)
+        if key is not None:
+            self.cache.set(key, model, text)
+        return text
+
+    async def astream(self, model, messages, temperature=None, **params):
+        """Completion text as it is generated (server-sent events), one delta at a time.
+
+        Retries only cover the wait for the response; once text has been yielded a failure is
+        raised instead of silently restarting the answer. Time-to-first-token and total latency
+        are logged against the model that actually served the request.
+        """
+        payload = {"model": model, "messages": messages, **params, "stream": True}
+        if temperature is not None:
+            payload["temperature"] = temperature
+        key, cached = self._cached(model, messages, temperature, params)
+        if cached is not None:
+            yield cached
+            return
+
+        http = await self._session()
+        bucket = _bucket(self.provider, self._rpm)
+        started, first, served, parts = time.monotonic(), None, model, []
+        try:
+            for attempt in range(self.max_retries + 1):
+                async with self._semaphore:
+                    await bucket.acquire()
+                    try:
+                        async with http.stream("POST", "/chat/completions", json=payload) as response:
+                            if response.status_code == 200:
+                                async for line in response.aiter_lines():
+                                    delta = sse_delta(line)
+                                    if delta is None:
+                                        continue
+                                    served = delta[0] or served
+                                    if delta[1]:
+                                        if first is None:
+                                            first = time.monotonic()
+                                        parts.append(delta[1])
+                                        yield delta[1]
+                                break
+                            body = (await response.aread()).decode("utf-8", "replace")
+                            if response.status_code not in RETRY_STATUSES:
+                                raise LLMError(f"API Error {response.status_code}: {body[:500]}")
+                            error, retry_after = f"API Error {response.status_code}", _retry_after(response)
+                            if response.status_code == 429:
+                                bucket.penalise(retry_after or 1.0)
+                    except httpx.TransportError as e:
+                        if parts:
+                            raise LLMError(f"Stream interrupted: {e}") from e
+                        error, retry_after = e, None
+                if attempt < self.max_retries:
+                    await asyncio.sleep(backoff_delay(attempt, retry_after))
+            else:
+                raise LLMError(f"Gave up after {self.max_retries + 1} attempts: {error}")
+        except LLMError:
+            self._record(served, started, first, sum(map(len, parts)), ok=False)
+            raise
+        text = "".join(parts)
+        self._record(served, started, first, len(text), ok=True)
+        if key is not None:
+            self.cache.set(key, model, text.strip())
+
+    async def amodels(self):
+        """Ids of the models the provider currently serves, sorted."""
+        http = await self._session()
+        try:
+            response = await http.get("/models")
+        except httpx.TransportError as e:
+            raise LLMError(f"Could not fetch model list: {e}") from e
+        if response.status_code != 200:
+            raise LLMError(f"API Error {response.status_code}: {response.text[:500]}")
+        try:
+            return sorted(m["id"] for m in response.json()["data"])
+        except (ValueError, KeyError, TypeError) as e:
+            raise LLMError(f"Unexpected response format: {response.text[:500]}") from e
+
+    async def acomplete_many(self, model, batch, temperature=None, **params):
+        """Fan out many message lists at once; failures come back as exceptions in their slot."""
+        tasks = [self.acomplete(model, messages, temperature, **params) for messages in batch]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    # --- sync API (for Streamlit scripts) ---
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result()
+
+    def complete(self, model, messages, temperature=None, **params):
+        return self._run(self.acomplete(model, messages, temperature, **params))
+
+    def complete_many(self, model, batch, temperature=None, **params):
+        return self._run(self.acomplete_many(model, batch, temperature, **params))
+
+    def stream(self, model, messages, temperature=None, **params):
+        """Blocking iterator over `astream` deltas, e.g. for `st.write_stream`."""
+        chunks = queue.Queue()
+
+        async def pump():
+            try:
+                async for text in self.astream(model, messages, temperature, **params):
+                    chunks.put(text)
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                chunks.put(_DONE)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), _background_loop())
+        try:
+            while (item := chunks.get()) is not _DONE:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # The reader stopped early (e.g. the script reran): stop reading the response too
+            future.cancel()
+
+    def models_future(self):
+        """Start fetching the model list on the background loop and return its Future right away."""
+        return asyncio.run_coroutine_threadsafe(self.amodels(), _background_loop())
+
+    def close(self):
+        if self._http is not None:
+            self._run(self._http.aclose())
+            self._http = None
+
+
+@lru_cache(maxsize=None)
+def get_client(provider, api_key):
+    """Process-wide pooled client per provider/key, reused across Streamlit reruns and sessions."""
+    return LLMClient(provider, api_key)
@@ -0,0 +1,96 @@
+import os
+import time
+import sqlite3
+import threading
+from statistics import median
+from functools import lru_cache
+
+# === Defaults ===
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATH = os.environ.get("LLM_METRICS_PATH", os.path.join(REPO_ROOT, ".cache", "llm_metrics.sqlite"))
+RECENT_CALLS = 50   # per-model window the summary's medians are taken over; older rows are pruned
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS latency (
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    ttft REAL,
+    total REAL NOT NULL,
+    chars INTEGER NOT NULL,
+    ok INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS latency_provider_model ON latency (provider, model, created_at);
+CREATE INDEX IF NOT EXISTS latency_created ON latency (created_at);
+"""
+
+
+class LatencyLog:
+    """SQLite log of time-to-first-token and total latency per completion, summarised per model."""
+
+    def __init__(self, path=DEFAULT_PATH, keep=RECENT_CALLS):
+        self.path = path
+        self.keep = keep
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def record(self, provider, model, ttft, total, chars=0, ok=True):
+        """One finished (or failed) call; `ttft` is None for non-streamed calls or no text at all.
+
+        Only the model's `keep` most recent calls are retained, so the table stays small.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO latency VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (provider, model, ttft, total, chars, int(ok), time.time()),
+            )
+            self._conn.execute(
+                """DELETE FROM latency WHERE provider = ? AND model = ? AND created_at < (
+                       SELECT created_at FROM latency WHERE provider = ? AND model = ?
+                       ORDER BY created_at DESC LIMIT 1 OFFSET ?)""",
+                (provider, model, provider, model, self.keep - 1),
+            )
+
+    def summary(self, recent=RECENT_CALLS):
+        """Per-model medians over the last `recent` calls, fastest time-to-first-token first."""
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT provider, model, ttft, total, ok FROM (
+                       SELECT *, ROW_NUMBER() OVER (
+                           PARTITION BY provider, model ORDER BY created_at DESC) AS recency
+                       FROM latency)
+                   WHERE recency <= ? ORDER BY created_at DESC""",
+                (recent,),
+            ).fetchall()
+        calls = {}
+        for provider, model, ttft, total, ok in rows:
+            calls.setdefault((provider, model), []).append((ttft, total, ok))
+        summary = []
+        for (provider, model), bucket in calls.items():
+            succeeded = [(ttft, total) for ttft, total, ok in bucket if ok]
+            ttfts = [ttft for ttft, _ in succeeded if ttft is not None]
+            summary.append({
+                "provider": provider,
+                "model": model,
+                "calls": len(bucket),
+                "failures": len(bucket) - len(succeeded),
+                "median_ttft": median(ttfts) if ttfts else None,
+                "median_total": median(total for _, total in succeeded) if succeeded else None,
+                "last_ttft": bucket[0][0],
+                "last_total": bucket[0][1],
+            })
+        return sorted(summary, key=lambda row: (row["median_ttft"] is None, row["median_ttft"] or 0))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM latency")
+
+
+@lru_cache(maxsize=None)
+def get_latency_log(path=DEFAULT_PATH):
+    """Process-wide latency log shared by every Streamlit session."""
+    return LatencyLog(path)
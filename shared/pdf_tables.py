@@ -0,0 +1,115 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+PAGES_PER_TASK = 8   # pages parsed per worker task; small enough that page 1 comes back quickly
+MAX_WORKERS = max(1, min(4, (os.cpu_count() or 1)))
+
+_pdf_bytes = None  # set once per worker process by _init_worker
+
+
+def unique_headers(headers):
+    """Make repeated/blank table headers unique so they can become DataFrame columns."""
+    seen = {}
+    unique = []
+    for h in headers:
+        h = "" if h is None else str(h)
+        if h in seen:
+            seen[h] += 1
+            unique.append(f"{h}_{seen[h]}")
+        else:
+            seen[h] = 0
+            unique.append(h)
+    return unique
+
+
+def table_frame(rows):
+    """First row is the header; returns None for tables without at least one data row."""
+    if not rows or len(rows) < 2:
+        return None
+    return pd.DataFrame(rows[1:], columns=unique_headers(rows[0]))
+
+
+def _init_worker(data):
+    global _pdf_bytes
+    _pdf_bytes = data
+
+
+def _pymupdf_tables(start, stop):
+    import fitz  # PyMuPDF
+
+    pages = []
+    with fitz.open(stream=_pdf_bytes, filetype="pdf") as doc:
+        for number in range(start, min(stop, doc.page_count)):
+            pages.append([table.extract() for table in doc[number].find_tables().tables])
+    return pages
+
+
+def _pdfplumber_tables(start, stop):
+    import pdfplumber
+
+    with pdfplumber.open(io.BytesIO(_pdf_bytes)) as pdf:
+        return [page.extract_tables() for page in pdf.pages[start:stop]]
+
+
+def _extract_range(start, stop):
+    """Raw table rows for pages [start, stop): PyMuPDF when it can, pdfplumber otherwise.
+
+    Pages PyMuPDF parsed without finding tables are taken as table-free; pdfplumber only runs
+    when PyMuPDF itself failed.
+    """
+    try:
+        return _pymupdf_tables(start, stop)
+    except Exception:
+        # PyMuPDF missing, an old build without find_tables, or a page it can't handle
+        return _pdfplumber_tables(start, stop)
+
+
+def page_count(data):
+    try:
+        import fitz
+
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            return doc.page_count
+    except ImportError:
+        import pdfplumber
+
+        with pdfplumber.open(io.BytesIO(data)) as pdf:
+            return len(pdf.pages)
+
+
+def iter_pdf_tables(data, max_workers=MAX_WORKERS, pages_per_task=PAGES_PER_TASK):
+    """Yield a DataFrame per table, in page order, while later pages are still being parsed.
+
+    Page ranges are spread over a process pool; consumers can start on the first tables
+    without waiting for the whole document or holding every page in memory.
+    """
+    total = page_count(data)
+    ranges = [(start, start + pages_per_task) for start in range(0, total, pages_per_task)]
+    if max_workers <= 1 or len(ranges) <= 1:
+        _init_worker(data)
+        results = (_extract_range(start, stop) for start, stop in ranges)
+        yield from _frames(results)
+        return
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(data,)) as pool:
+        yield from _frames(pool.map(_extract_range, *zip(*ranges)))
+
+
+def _frames(results):
+    for pages in results:
+        for tables in pages:
+            for rows in tables:
+                frame = table_frame(rows)
+                if frame is not None:
+                    yield frame
+
+
+def iter_pdf_text(data):
+    """Yield the text of each page in turn (PyMuPDF), for PDFs that have no tables."""
+    import fitz
+
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        for page in doc:
+            yield page.get_text()
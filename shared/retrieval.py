@@ -0,0 +1,97 @@
+import os
+import re
+import math
+from collections import Counter, defaultdict
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STORE = os.path.join(REPO_ROOT, ".cache", "embeddings")
+TOP_N = 15
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return _TOKEN.findall(str(text).lower())
+
+
+class BM25Index:
+    """Okapi BM25 over short texts (account descriptions); needs nothing beyond numpy."""
+
+    def __init__(self, docs, k1=1.5, b=0.75):
+        self.size = len(docs)
+        tokenized = [tokenize(d) for d in docs]
+        lengths = np.array([len(t) for t in tokenized], dtype=np.float32)
+        norm = k1 * (1 - b + b * lengths / max(lengths.mean(), 1.0)) if self.size else lengths
+
+        postings = defaultdict(lambda: ([], []))
+        for doc_id, tokens in enumerate(tokenized):
+            for term, tf in Counter(tokens).items():
+                postings[term][0].append(doc_id)
+                postings[term][1].append(tf)
+
+        # Precompute each posting's full BM25 weight so a query is just a few scatter-adds
+        self.postings = {}
+        for term, (ids, tfs) in postings.items():
+            ids = np.array(ids, dtype=np.int32)
+            tfs = np.array(tfs, dtype=np.float32)
+            idf = math.log(1 + (self.size - len(ids) + 0.5) / (len(ids) + 0.5))
+            self.postings[term] = (ids, idf * tfs * (k1 + 1) / (tfs + norm[ids]))
+
+    def scores(self, query):
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term in self.postings:
+                ids, weights = self.postings[term]
+                scores[ids] += weights
+        return scores
+
+    def top_n(self, query, n=TOP_N):
+        """Positions of the n best matching documents, ties broken by document order.
+
+        Documents sharing no term with the query are never returned, so an unmatched query
+        gets an empty list rather than the first n documents.
+        """
+        scores = self.scores(query)
+        best = np.argsort(-scores, kind="stable")[:min(n, self.size)]
+        return best[scores[best] > 0]
+
+
+class CandidateRetriever:
+    """Shortlists the most relevant chart entries for each query before anything is sent to an LLM.
+
+    Uses the same normalised embedding index as coa_assistant (persisted under `store_dir`), and
+    falls back to BM25 when sentence-transformers/faiss aren't installed or the model can't be
+    loaded. Any other index or embedding error is raised rather than hidden behind the fallback.
+    """
+
+    def __init__(self, texts, name="coa", use_embeddings=True, store_dir=DEFAULT_STORE, model_name=None):
+        self.texts = [str(t) for t in dict.fromkeys(texts) if isinstance(t, str) and t.strip()]
+        self.bm25 = BM25Index(self.texts)
+        self.model = self.index = None
+        if use_embeddings and self.texts:
+            try:
+                from shared import embedding_index
+
+                model_name = model_name or embedding_index.DEFAULT_MODEL
+                self.model = embedding_index.load_model(model_name)
+                key = embedding_index.content_key(model_name, *self.texts)
+                self.index, _ = embedding_index.load_or_build(
+                    self.texts, self.model, os.path.join(store_dir, f"{name}-{key}")
+                )
+            except (ImportError, OSError):
+                # Missing packages, or model weights that can't be downloaded/read
+                self.model = self.index = None
+        self.mode = "embeddings" if self.index is not None else "bm25"
+
+    def candidates(self, queries, n=TOP_N):
+        """Top-n chart texts for every query, best first; empty when nothing in the chart matches."""
+        if not self.texts:
+            return [[] for _ in queries]
+        if self.index is not None:
+            from shared.embedding_index import search_many
+
+            _, positions = search_many(self.model, self.index, [str(q) for q in queries], n)
+            return [[self.texts[p] for p in row if p >= 0] for row in positions]
+        return [[self.texts[p] for p in self.bm25.top_n(q, n)] for q in queries]
@@ -0,0 +1,101 @@
+import os
+import threading
+from datetime import date, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+def day(value):
+    return pd.Timestamp(value).normalize().date()
+
+
+class SpanStore:
+    """Date-indexed frames persisted as Parquet, one file per key, with the date span already
+    asked of the source.
+
+    Weekends, holidays and pre-listing dates have no rows, so the covered span can't be read
+    off the data and is kept in the file's metadata instead. A span only counts as covered when
+    its fetch returned rows, and only up to the last completed day it returned, so an outage or
+    a not-yet-published close is asked for again. Used by the FX and price stores.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, f"{key}.parquet")
+
+    def read(self, key):
+        """(frame, covered_start, covered_end); (None, None, None) when nothing is stored."""
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None, None, None
+        table = pq.read_table(path)
+        meta = table.schema.metadata or {}
+        return (
+            table.to_pandas().set_index("Date"),
+            date.fromisoformat(meta[b"covered_start"].decode()),
+            date.fromisoformat(meta[b"covered_end"].decode()),
+        )
+
+    def write(self, key, frame, covered_start, covered_end):
+        os.makedirs(self.root, exist_ok=True)
+        table = pa.Table.from_pandas(frame.rename_axis("Date").reset_index(), preserve_index=False)
+        table = table.replace_schema_metadata({
+            "covered_start": covered_start.isoformat(),
+            "covered_end": covered_end.isoformat(),
+        })
+        path = self.path(key)
+        tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def missing(covered_start, covered_end, start, end):
+        """Date ranges inside [start, end] that haven't been fetched yet."""
+        if covered_start is None:
+            return [(start, end)]
+        gaps = []
+        if start < covered_start:
+            gaps.append((start, covered_start - timedelta(days=1)))
+        if end > covered_end:
+            gaps.append((covered_end + timedelta(days=1), end))
+        return gaps
+
+    @staticmethod
+    def covered(covered_start, covered_end, fetched):
+        """Covered span widened by the fetched gaps that returned rows.
+
+        `fetched` holds ((gap_start, gap_end), frame) pairs for gaps from `missing`. An empty
+        fetch leaves its gap uncovered, and a trailing gap is only covered up to its last
+        completed day.
+        """
+        yesterday = date.today() - timedelta(days=1)
+        for (a, b), part in fetched:
+            if part.empty:
+                continue
+            last = min(b, part.index.max().date(), yesterday)
+            if last < a:
+                continue
+            if covered_start is None:
+                covered_start, covered_end = a, last
+            elif a < covered_start:
+                covered_start = a
+            else:
+                covered_end = max(covered_end, last)
+        return covered_start, covered_end
+
+    def merge(self, key, stored, covered_start, covered_end, fetched):
+        """Fold fetched frames into `stored`, persisting when the covered span grew.
+
+        Returns (frame, covered_start, covered_end).
+        """
+        parts = [part for part in (stored, *(part for _, part in fetched)) if not part.empty]
+        frame = pd.concat(parts).sort_index() if parts else stored
+        frame = frame[~frame.index.duplicated(keep="last")]
+        widened = self.covered(covered_start, covered_end, fetched)
+        if widened != (covered_start, covered_end):
+            self.write(key, frame, *widened)
+        return (frame, *widened)
@@ -0,0 +1,43 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from shared.span_store import SpanStore
+
+
+def closes(start, end):
+    days = pd.bdate_range(start, end)
+    return pd.DataFrame({"Close": np.linspace(1.0, 2.0, len(days))}, index=days)
+
+
+def test_missing_gaps_around_covered_span():
+    assert SpanStore.missing(None, None, date(2024, 1, 1), date(2024, 1, 31)) == [(date(2024, 1, 1), date(2024, 1, 31))]
+    assert SpanStore.missing(date(2024, 1, 10), date(2024, 1, 20), date(2024, 1, 1), date(2024, 1, 31)) == [
+        (date(2024, 1, 1), date(2024, 1, 9)),
+        (date(2024, 1, 21), date(2024, 1, 31)),
+    ]
+    assert SpanStore.missing(date(2024, 1, 1), date(2024, 1, 31), date(2024, 1, 10), date(2024, 1, 20)) == []
+
+
+def test_empty_fetch_is_not_marked_covered(tmp_path):
+    store = SpanStore(str(tmp_path))
+    gap = (date(2024, 1, 1), date(2024, 3, 29))
+    frame, start, end = store.merge("USDEUR", closes(*gap).iloc[:0], None, None, [(gap, closes(*gap).iloc[:0])])
+    assert frame.empty and (start, end) == (None, None)
+    assert store.read("USDEUR") == (None, None, None)
+
+    store.merge("USDEUR", frame, None, None, [(gap, closes(*gap))])
+    frame, start, end = SpanStore(str(tmp_path)).read("USDEUR")
+    assert (start, end) == gap
+    assert len(frame) == len(pd.bdate_range(*gap))
+
+
+def test_coverage_stops_at_last_returned_day(tmp_path):
+    # Nothing after `last` came back, e.g. yesterday's close isn't published yet
+    last = date(2024, 3, 15)
+    store = SpanStore(str(tmp_path))
+    gap = (date(2024, 2, 1), date(2024, 3, 29))
+    store.merge("USDEUR", closes(*gap).iloc[:0], None, None, [(gap, closes(gap[0], last))])
+    _, _, covered_end = store.read("USDEUR")
+    assert covered_end == last
@@ -1,22 +1,56 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from datetime import date
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repo root, for shared/
+from shared.downsample import POINT_BUDGET, resample_bars, window
+from price_store import PriceStore
+from indicators import SMA_WINDOWS, compute
+from risk import ANNOTATE_MAX, heatmap_matrix, rolling_mean_correlation, value_at_risk
+from risk import analyze as analyze_risk
 
 # App Title
 st.title("Stock Market Visualizer with Enhanced Analytics")
 st.sidebar.title("Options")
 
 # Helper Functions
+@st.cache_resource
+def get_price_store():
+    """Local OHLCV store under .cache/prices; only missing dates are downloaded."""
+    return PriceStore()
+
+@st.cache_data(show_spinner=False, ttl=3600)
 def fetch_stock_data(ticker, start_date, end_date):
-    """Fetch stock data using yfinance."""
-    stock = yf.Ticker(ticker)
-    return stock.history(start=start_date, end=end_date)
+    """Fetch stock data from the local store, topping it up from yfinance."""
+    return get_price_store().history(ticker, start_date, end_date)
+
+@st.cache_data(show_spinner="Computing portfolio risk...", ttl=3600)
+def get_portfolio_risk(tickers, start_date, end_date):
+    """Return correlations, covariances and rolling correlation for the portfolio."""
+    closes, _ = fetch_portfolio_closes(tickers, start_date, end_date)
+    portfolio_risk = analyze_risk(closes)
+    return portfolio_risk, rolling_mean_correlation(portfolio_risk.returns)
+
+@st.cache_resource(max_entries=32, show_spinner=False, ttl=3600)
+def get_indicators(ticker, start_date, end_date, last_bar, rows, _closes):
+    """Indicators for one ticker and range; the result is read-only, so it's shared rather than copied.
+
+    Keyed on the price frame's last bar and length too, so refreshed prices never pair with stale indicators.
+    """
+    return compute(_closes)
+
+@st.cache_data(show_spinner="Loading portfolio prices...", ttl=3600)
+def fetch_portfolio_closes(tickers, start_date, end_date):
+    """Close prices for every ticker, fetched concurrently; returns (matrix, {ticker: error message})."""
+    closes, errors = get_price_store().closes(list(tickers), start_date, end_date)
+    return closes, {t: str(e) for t, e in errors.items()}
 
 def plot_candlestick(data):
-    """Plot a candlestick chart."""
+    """Plot a candlestick chart, coarsened to weekly/monthly bars when the window has too many days."""
+    data, resolution = resample_bars(data[['Open', 'High', 'Low', 'Close']])
     fig = go.Figure()
     fig.add_trace(go.Candlestick(
         x=data.index,
@@ -26,40 +60,57 @@ def plot_candlestick(data):
         close=data['Close'],
         name="Candlestick"
     ))
-    fig.update_layout(title="Candlestick Chart", xaxis_title="Date", yaxis_title="Price", template="plotly_dark")
+    fig.update_layout(title=f"Candlestick Chart ({resolution} bars)", xaxis_title="Date", yaxis_title="Price", template="plotly_dark")
     st.plotly_chart(fig)
 
 def plot_volume(data):
-    """Plot a volume chart."""
-    fig = px.bar(data, x=data.index, y='Volume', title="Trading Volume", template="plotly_dark")
+    """Plot a volume chart; volume is summed into the same buckets as the candlesticks."""
+    data, resolution = resample_bars(data[['Volume']])
+    fig = px.bar(data, x=data.index, y='Volume', title=f"Trading Volume ({resolution})", template="plotly_dark")
     st.plotly_chart(fig)
 
-def plot_daily_returns(data):
+def plot_daily_returns(indicators):
     """Plot daily returns."""
-    data['Daily Return'] = data['Close'].pct_change() * 100
-    fig = px.line(data, x=data.index, y='Daily Return', title="Daily Returns (%)", template="plotly_dark")
+    daily = (indicators.returns["Close"] * 100).rename("Daily Return")
+    fig = px.line(daily, x=daily.index, y='Daily Return', title="Daily Returns (%)", template="plotly_dark")
     st.plotly_chart(fig)
 
-def plot_cumulative_returns(data):
+def plot_cumulative_returns(indicators):
     """Plot cumulative returns."""
-    data['Cumulative Return'] = (1 + data['Close'].pct_change()).cumprod() - 1
-    fig = px.line(data, x=data.index, y='Cumulative Return', title="Cumulative Returns", template="plotly_dark")
+    cumulative = indicators.cumulative_returns["Close"].rename("Cumulative Return")
+    fig = px.line(cumulative, x=cumulative.index, y='Cumulative Return', title="Cumulative Returns", template="plotly_dark")
     st.plotly_chart(fig)
 
-def plot_moving_averages(data, windows):
+def plot_moving_averages(data, indicators, windows):
     """Plot moving averages."""
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=data.index, y=data['Close'], mode='lines', name="Close Price"))
     for window in windows:
-        data[f"MA{window}"] = data['Close'].rolling(window=window).mean()
-        fig.add_trace(go.Scatter(x=data.index, y=data[f"MA{window}"], mode='lines', name=f"MA {window}"))
+        fig.add_trace(go.Scatter(x=data.index, y=indicators.sma[window]["Close"], mode='lines', name=f"MA {window}"))
     fig.update_layout(title="Moving Averages", xaxis_title="Date", yaxis_title="Price", template="plotly_dark")
     st.plotly_chart(fig)
 
-def plot_correlation_matrix(data):
-    """Plot correlation matrix for stock portfolio."""
-    corr = data.corr()
-    fig = px.imshow(corr, title="Correlation Matrix", template="plotly_dark", text_auto=True, color_continuous_scale='RdBu_r')
+def plot_momentum(indicators):
+    """Plot RSI and annualised rolling volatility."""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=indicators.rsi.index, y=indicators.rsi["Close"], mode='lines', name="RSI 14"))
+    fig.add_trace(go.Scatter(x=indicators.volatility.index, y=indicators.volatility["Close"] * 100, mode='lines', name="Volatility 21d (%)", yaxis="y2"))
+    fig.update_layout(
+        title="RSI and Rolling Volatility", xaxis_title="Date", template="plotly_dark",
+        yaxis=dict(title="RSI", range=[0, 100]), yaxis2=dict(title="Volatility (%)", overlaying="y", side="right"),
+    )
+    st.plotly_chart(fig)
+
+def plot_correlation_matrix(portfolio_risk):
+    """Plot the return correlation matrix, clustered; large portfolios are shown as cluster blocks."""
+    corr = heatmap_matrix(portfolio_risk)
+    title = "Return Correlation Matrix (clustered)"
+    if len(corr) < len(portfolio_risk.order):
+        title += f" - {len(portfolio_risk.order)} tickers averaged into {len(corr)} blocks"
+    fig = px.imshow(
+        corr, title=title, template="plotly_dark", zmin=-1, zmax=1,
+        text_auto=".2f" if len(corr) <= ANNOTATE_MAX else False, color_continuous_scale='RdBu_r',
+    )
     st.plotly_chart(fig)
 
 # Inputs
@@ -74,40 +125,69 @@ data = fetch_stock_data(ticker, start_date, end_date)
 if not data.empty:
     st.subheader(f"Stock Data for {ticker}")
     st.write(data.tail())
+    indicators = get_indicators(ticker, start_date, end_date, data.index[-1], len(data), data['Close'])
+
+    # Price charts are downsampled to a point budget; narrowing the window restores daily bars
+    first_day, last_day = data.index[0].date(), data.index[-1].date()
+    if len(data) > POINT_BUDGET:
+        chart_window = st.slider("Chart window", min_value=first_day, max_value=last_day, value=(first_day, last_day))
+    else:
+        chart_window = (first_day, last_day)
+    visible = window(data, *chart_window)
 
     # Candlestick Chart
     st.subheader("Candlestick Chart")
-    plot_candlestick(data)
+    plot_candlestick(visible)
 
     # Volume Chart
     st.subheader("Volume Chart")
-    plot_volume(data)
+    plot_volume(visible)
 
     # Daily Returns
     st.subheader("Daily Returns")
-    plot_daily_returns(data)
+    plot_daily_returns(indicators)
 
     # Cumulative Returns
     st.subheader("Cumulative Returns")
-    plot_cumulative_returns(data)
+    plot_cumulative_returns(indicators)
 
     # Moving Averages
     st.sidebar.header("Moving Averages")
-    moving_averages = st.sidebar.multiselect("Select Moving Averages (days)", options=[10, 20, 50, 100, 200], default=[20, 50])
+    moving_averages = st.sidebar.multiselect("Select Moving Averages (days)", options=list(SMA_WINDOWS), default=[20, 50])
     if moving_averages:
         st.subheader("Moving Averages")
-        plot_moving_averages(data, moving_averages)
+        plot_moving_averages(data, indicators, moving_averages)
+
+    # RSI / Volatility
+    st.subheader("Momentum and Volatility")
+    plot_momentum(indicators)
 
 # Portfolio Correlation
 st.sidebar.header("Portfolio Analysis")
 portfolio_file = st.sidebar.file_uploader("Upload Portfolio (CSV or Excel)")
 if portfolio_file:
     portfolio = pd.read_csv(portfolio_file) if portfolio_file.name.endswith("csv") else pd.read_excel(portfolio_file)
-    tickers = portfolio['Ticker'].tolist()
+    tickers = list(dict.fromkeys(portfolio['Ticker'].tolist()))  # a ticker listed twice is one position
     st.subheader("Portfolio Data")
     st.write(portfolio)
 
-    portfolio_data = {t: fetch_stock_data(t, start_date, end_date)['Close'] for t in tickers}
-    portfolio_df = pd.DataFrame(portfolio_data)
-    st.subheader("Correlation Matrix")
-    plot_correlation_matrix(portfolio_df)
+    portfolio_df, failed = fetch_portfolio_closes(tuple(tickers), start_date, end_date)
+    for t, error in failed.items():
+        st.warning(f"Could not load {t}: {error}")
+    if portfolio_df.shape[1] >= 2:
+        portfolio_risk, rolling_corr = get_portfolio_risk(tuple(tickers), start_date, end_date)
+        st.subheader("Correlation Matrix")
+        plot_correlation_matrix(portfolio_risk)
+
+        st.subheader("Rolling Average Correlation")
+        fig = px.line(rolling_corr, title="Average Pairwise Correlation (63-day windows)", template="plotly_dark")
+        st.plotly_chart(fig)
+
+        st.subheader("Portfolio Risk")
+        weights = portfolio.set_index('Ticker')['Weight'] if 'Weight' in portfolio.columns else None
+        var = value_at_risk(portfolio_risk, weights)
+        col1, col2, col3 = st.columns(3)
+        col1.metric("1-day VaR 95% (historical)", f"{var.historical:.2%}")
+        col2.metric("1-day VaR 95% (parametric)", f"{var.parametric:.2%}")
+        col3.metric("Annualised volatility", f"{var.volatility:.2%}")
+        st.caption(f"Covariance shrinkage intensity (Ledoit-Wolf): {portfolio_risk.shrinkage:.2f}")
@@ -0,0 +1,91 @@
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+SMA_WINDOWS = (10, 20, 50, 100, 200)
+EMA_SPANS = (12, 26)
+VOL_WINDOW = 21
+RSI_WINDOW = 14
+TRADING_DAYS = 252
+
+
+class Indicators(NamedTuple):
+    """Read-only indicator frames (dates x tickers); the price data they came from is never modified."""
+    returns: pd.DataFrame
+    cumulative_returns: pd.DataFrame
+    sma: Mapping[int, pd.DataFrame]
+    ema: Mapping[int, pd.DataFrame]
+    volatility: pd.DataFrame      # annualised rolling std of daily returns
+    rsi: pd.DataFrame
+
+
+def _windowed_sums(values, windows):
+    """Trailing-window sums and valid-value counts for every window, from one cumulative sum."""
+    finite = np.isfinite(values)
+    padded = np.zeros((values.shape[0] + 1, values.shape[1]))
+    counts = np.zeros_like(padded)
+    padded[1:] = np.cumsum(np.where(finite, values, 0.0), axis=0)
+    counts[1:] = np.cumsum(finite, axis=0)
+    result = {}
+    for w in windows:
+        sums = np.full_like(values, np.nan, dtype=np.float64)
+        valid = np.zeros(values.shape, dtype=bool)
+        if w <= len(values):
+            sums[w - 1:] = padded[w:] - padded[:-w]
+            valid[w - 1:] = (counts[w:] - counts[:-w]) == w
+        result[w] = (sums, valid)
+    return result
+
+
+def _frame(values, like):
+    values.setflags(write=False)
+    return pd.DataFrame(values, index=like.index, columns=like.columns, copy=False)
+
+
+def compute(prices, sma_windows=SMA_WINDOWS, ema_spans=EMA_SPANS, vol_window=VOL_WINDOW, rsi_window=RSI_WINDOW):
+    """All indicators for a close-price Series (one ticker) or DataFrame (a ticker per column).
+
+    Every SMA comes from a single cumulative sum, and volatility from cumulative sums of
+    returns and squared returns, so adding windows costs one subtraction each.
+    """
+    if isinstance(prices, pd.Series):
+        prices = prices.to_frame(prices.name or "Close")
+    values = prices.to_numpy(dtype=np.float64, copy=True)
+
+    returns = np.full_like(values, np.nan)
+    returns[1:] = values[1:] / values[:-1] - 1
+    first = pd.DataFrame(values).bfill().to_numpy()[0] if len(values) else values[:0]
+    # Same as (1 + returns).cumprod() - 1, without the running product
+    cumulative = np.where(np.isfinite(returns), values / first - 1, np.nan)
+
+    sma = {}
+    for w, (sums, valid) in _windowed_sums(values, sma_windows).items():
+        sma[w] = _frame(np.where(valid, sums / w, np.nan), prices)
+
+    # Rolling sample std from windowed sums of r and r^2
+    sums = _windowed_sums(returns, [vol_window])[vol_window]
+    squares = _windowed_sums(returns * returns, [vol_window])[vol_window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = (squares[0] - sums[0] ** 2 / vol_window) / (vol_window - 1)
+    volatility = np.where(sums[1], np.sqrt(np.clip(variance, 0, None)) * np.sqrt(TRADING_DAYS), np.nan)
+
+    # EMA and Wilder's RSI are recursive; pandas' ewm runs them over all columns at once
+    frame = pd.DataFrame(values, index=prices.index, columns=prices.columns)
+    ema = {span: _frame(frame.ewm(span=span, adjust=False).mean().to_numpy(), prices) for span in ema_spans}
+
+    change = frame.diff()
+    gain = change.clip(lower=0).ewm(alpha=1 / rsi_window, adjust=False, min_periods=rsi_window).mean()
+    loss = (-change.clip(upper=0)).ewm(alpha=1 / rsi_window, adjust=False, min_periods=rsi_window).mean()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rsi = (100 - 100 / (1 + gain / loss)).to_numpy()
+
+    return Indicators(
+        returns=_frame(returns, prices),
+        cumulative_returns=_frame(cumulative, prices),
+        sma=MappingProxyType(sma),
+        ema=MappingProxyType(ema),
+        volatility=_frame(volatility, prices),
+        rsi=_frame(rsi, prices),
+    )
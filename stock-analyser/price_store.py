@@ -0,0 +1,143 @@
+import os
+import sys
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repo root, for shared/
+from shared.span_store import SpanStore, day
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_DIR = os.path.join(REPO_ROOT, ".cache", "prices")
+OHLCV = ["Open", "High", "Low", "Close", "Volume"]
+ACTIONS = ["Dividends", "Stock Splits"]
+MAX_WORKERS = 16
+
+
+def _empty():
+    return pd.DataFrame(columns=OHLCV + ACTIONS, index=pd.DatetimeIndex([], name="Date"), dtype="float64")
+
+
+# === Sources ===
+
+class YahooSource:
+    """Daily split/dividend-adjusted OHLCV bars from yfinance, with the Dividends and Stock Splits columns."""
+
+    def fetch(self, ticker, start, end):
+        import yfinance as yf
+
+        # history() treats `end` as exclusive
+        return yf.Ticker(ticker).history(start=start, end=end + timedelta(days=1), auto_adjust=True, actions=True)
+
+
+class CSVSource:
+    """Reads `{TICKER}.csv` files (Date, Open, High, Low, Close, Volume[, Dividends, Stock Splits]); an offline/test fixture."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def fetch(self, ticker, start, end):
+        path = os.path.join(self.directory, f"{ticker}.csv")
+        if not os.path.exists(path):
+            return _empty()
+        bars = pd.read_csv(path, index_col="Date", parse_dates=True)
+        return bars.loc[pd.Timestamp(start):pd.Timestamp(end)].reindex(columns=OHLCV + ACTIONS)
+
+
+# === Store ===
+
+class PriceStore:
+    """Daily OHLCV bars persisted as Parquet per ticker, topped up with only the missing dates.
+
+    Coverage is tracked by the shared SpanStore, as for the FX store, so weekends, holidays
+    and pre-IPO dates aren't re-requested while empty fetches are. Tickers lock
+    independently, so bulk fetches run in parallel.
+
+    Bars are adjusted as of the day they were fetched, so when a top-up brings a split or
+    dividend the stored bars don't know about, the ticker's whole span is fetched again
+    rather than appending re-based prices to stale ones.
+    """
+
+    def __init__(self, source=None, root=STORE_DIR):
+        self.source = source or YahooSource()
+        self.spans = SpanStore(root)
+        self._locks = defaultdict(threading.Lock)
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, ticker):
+        with self._locks_guard:
+            return self._locks[ticker.upper()]
+
+    def _read(self, ticker):
+        """(bars, covered_start, covered_end); empty bars and None bounds when nothing is stored."""
+        bars, covered_start, covered_end = self.spans.read(ticker.upper())
+        if bars is None:
+            return _empty(), None, None
+        bars = bars.reindex(columns=OHLCV + ACTIONS)
+        bars[ACTIONS] = bars[ACTIONS].fillna(0.0)
+        return bars, covered_start, covered_end
+
+    def _fetch(self, ticker, start, end):
+        bars = self.source.fetch(ticker, start, end)
+        if bars is None or bars.empty:
+            return _empty()
+        bars = bars.reindex(columns=OHLCV + ACTIONS).astype("float64")
+        bars[ACTIONS] = bars[ACTIONS].fillna(0.0)
+        bars.index = pd.DatetimeIndex(bars.index).tz_localize(None).normalize()
+        bars.index.name = "Date"
+        return bars[~bars.index.duplicated(keep="last")]
+
+    @staticmethod
+    def new_actions(bars, fetched):
+        """True when fetched bars carry a split or dividend that the stored bars, adjusted before it, predate."""
+        if bars.empty:
+            return False
+        for _, part in fetched:
+            actions = part.loc[part.index > bars.index[0], ACTIONS]
+            for when, row in actions[(actions != 0).any(axis=1)].iterrows():
+                if when not in bars.index or (bars.loc[when, ACTIONS] != row).any():
+                    return True
+        return False
+
+    def history(self, ticker, start, end):
+        """OHLCV bars for `ticker` between `start` and `end` (inclusive)."""
+        start, end = day(start), day(end)
+        with self._lock(ticker):
+            bars, covered_start, covered_end = self._read(ticker)
+            gaps = SpanStore.missing(covered_start, covered_end, start, end)
+            if gaps:
+                fetched = [((a, b), self._fetch(ticker, a, b)) for a, b in gaps]
+                if self.new_actions(bars, fetched):
+                    a, b = min(start, covered_start), max(end, covered_end)
+                    refetched = self._fetch(ticker, a, b)
+                    if not refetched.empty:
+                        bars, covered_start, covered_end = _empty(), None, None
+                        fetched = [((a, b), refetched)]
+                bars, _, _ = self.spans.merge(ticker.upper(), bars, covered_start, covered_end, fetched)
+        return bars.loc[pd.Timestamp(start):pd.Timestamp(end), OHLCV]
+
+    def history_many(self, tickers, start, end, max_workers=MAX_WORKERS):
+        """{ticker: bars} for many tickers, topped up in a thread pool; failed tickers map to exceptions."""
+        tickers = list(dict.fromkeys(tickers))
+
+        def load(ticker):
+            try:
+                return self.history(ticker, start, end)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers)))) as pool:
+            return dict(zip(tickers, pool.map(load, tickers)))
+
+    def closes(self, tickers, start, end, max_workers=MAX_WORKERS):
+        """Close prices as a date x ticker matrix (columns in `tickers` order) plus {ticker: error}."""
+        results = self.history_many(tickers, start, end, max_workers)
+        errors = {t: r for t, r in results.items() if isinstance(r, Exception)}
+        errors.update({t: ValueError("no price data") for t, r in results.items() if t not in errors and r.empty})
+        columns = {t: r["Close"] for t, r in results.items() if t not in errors}
+        matrix = pd.DataFrame(columns, columns=[t for t in results if t in columns])
+        matrix.index.name = "Date"
+        return matrix, errors
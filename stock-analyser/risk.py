@@ -0,0 +1,173 @@
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+HEATMAP_MAX = 60        # above this many tickers the heatmap shows clusters, not single names
+ANNOTATE_MAX = 25       # per-cell labels only for small matrices
+ROLLING_WINDOW = 63     # ~3 months
+ROLLING_STEP = 5
+
+
+class PortfolioRisk(NamedTuple):
+    returns: pd.DataFrame
+    correlation: pd.DataFrame
+    covariance: pd.DataFrame        # annualised sample covariance
+    shrunk_covariance: pd.DataFrame  # Ledoit-Wolf, annualised
+    shrinkage: float
+    order: list                      # tickers in hierarchical-clustering order
+
+
+class ValueAtRisk(NamedTuple):
+    confidence: float
+    horizon_days: int
+    historical: float    # loss as a fraction of portfolio value
+    parametric: float
+    volatility: float    # annualised portfolio volatility
+
+
+def daily_returns(closes):
+    """Simple daily returns as float32; tickers without at least two prices are dropped."""
+    values = closes.to_numpy(dtype=np.float32)
+    returns = values[1:] / values[:-1] - 1
+    frame = pd.DataFrame(returns, index=closes.index[1:], columns=closes.columns)
+    return frame.loc[:, frame.notna().sum() >= 2]
+
+
+def _centred(returns):
+    """Demeaned returns with gaps as 0, plus the per-pair count of overlapping observations."""
+    values = returns.to_numpy(dtype=np.float32)
+    valid = np.isfinite(values)
+    means = np.nanmean(values, axis=0)
+    centred = np.where(valid, values - means, np.float32(0))
+    mask = valid.astype(np.float32)
+    return centred, mask.T @ mask
+
+
+def covariance_matrix(returns):
+    """Sample covariance in one float32 matmul. Gaps count as the ticker's mean, so tickers with
+    shorter histories (recent listings) still pair with the rest."""
+    centred, overlap = _centred(returns)
+    return (centred.T @ centred) / np.maximum(overlap - 1, 1)
+
+
+def correlation_from_covariance(cov):
+    std = np.sqrt(np.clip(np.diag(cov), 1e-20, None))
+    corr = cov / np.outer(std, std)
+    np.fill_diagonal(corr, 1.0)
+    return np.clip(corr, -1.0, 1.0)
+
+
+def ledoit_wolf(returns):
+    """Ledoit-Wolf shrinkage towards a scaled identity; returns (covariance, shrinkage intensity)."""
+    centred, _ = _centred(returns)
+    n, k = centred.shape
+    sample = (centred.T @ centred) / n
+    mu = np.trace(sample) / k
+    target = mu * np.eye(k, dtype=np.float32)
+    delta = np.sum((sample - target) ** 2) / k
+    squared = centred ** 2
+    beta = (np.sum((squared.T @ squared) / n) - np.sum(sample ** 2)) / (k * n)
+    shrinkage = float(min(max(beta / delta, 0.0), 1.0)) if delta > 0 else 1.0
+    return shrinkage * target + (1 - shrinkage) * sample, shrinkage
+
+
+def cluster_order(corr):
+    """Leaf order of an average-linkage clustering on 1 - correlation (scipy), else by the
+    leading eigenvector when scipy isn't installed."""
+    k = len(corr)
+    if k <= 2:
+        return list(range(k))
+    try:
+        from scipy.cluster.hierarchy import leaves_list, linkage
+        from scipy.spatial.distance import squareform
+
+        distance = np.clip(1 - np.asarray(corr, dtype=np.float64), 0, 2)
+        np.fill_diagonal(distance, 0)
+        return leaves_list(linkage(squareform(distance, checks=False), method="average")).tolist()
+    except ImportError:
+        _, vectors = np.linalg.eigh(np.asarray(corr, dtype=np.float64))
+        return np.argsort(vectors[:, -1]).tolist()
+
+
+def analyze(closes):
+    """Return-based correlation/covariance (never raw prices), shrinkage and a clustering order."""
+    returns = daily_returns(closes.loc[:, ~closes.columns.duplicated()])
+    tickers = returns.columns
+    cov = covariance_matrix(returns)
+    shrunk, shrinkage = ledoit_wolf(returns)
+    corr = correlation_from_covariance(cov)
+    order = [tickers[i] for i in cluster_order(corr)]
+
+    def frame(values):
+        return pd.DataFrame(values, index=tickers, columns=tickers)
+
+    return PortfolioRisk(
+        returns=returns,
+        correlation=frame(corr),
+        covariance=frame(cov * TRADING_DAYS),
+        shrunk_covariance=frame(shrunk * TRADING_DAYS),
+        shrinkage=shrinkage,
+        order=order,
+    )
+
+
+def rolling_mean_correlation(returns, window=ROLLING_WINDOW, step=ROLLING_STEP):
+    """Average pairwise correlation over trailing windows ending every `step` days."""
+    values = returns.to_numpy(dtype=np.float32)
+    k = values.shape[1]
+    ends, averages = [], []
+    for end in range(window, len(values) + 1, step):
+        block = values[end - window:end]
+        block = block[:, np.isfinite(block).all(axis=0)]
+        if block.shape[1] < 2:
+            continue
+        block = block - block.mean(axis=0)
+        std = block.std(axis=0)
+        block = block[:, std > 0] / std[std > 0]
+        m = block.shape[1]
+        if m < 2:
+            continue
+        corr_sum = np.sum((block.T @ block) / window)
+        ends.append(returns.index[end - 1])
+        averages.append((corr_sum - m) / (m * (m - 1)))
+    return pd.Series(averages, index=pd.DatetimeIndex(ends, name="Date"), name=f"Avg correlation ({k} tickers)")
+
+
+def value_at_risk(risk, weights=None, confidence=0.95, horizon_days=1):
+    """Historical and parametric (normal, shrunk covariance) VaR of the weighted portfolio.
+
+    `weights` maps ticker to weight; a ticker listed more than once gets the sum of its weights.
+    """
+    tickers = list(risk.returns.columns)
+    if weights is None:
+        w = np.full(len(tickers), 1 / len(tickers))
+    else:
+        weights = pd.Series(weights, dtype="float64")
+        w = weights.groupby(level=0).sum().reindex(tickers).fillna(0).to_numpy()
+        w = w / w.sum() if w.sum() else np.full(len(tickers), 1 / len(tickers))
+
+    daily = np.nan_to_num(risk.returns.to_numpy(dtype=np.float64)) @ w
+    historical = -np.quantile(daily, 1 - confidence) * np.sqrt(horizon_days)
+
+    from statistics import NormalDist
+
+    sigma_annual = float(np.sqrt(w @ risk.shrunk_covariance.to_numpy(dtype=np.float64) @ w))
+    sigma = sigma_annual * np.sqrt(horizon_days / TRADING_DAYS)
+    z = NormalDist().inv_cdf(confidence)
+    parametric = z * sigma - daily.mean() * horizon_days
+    return ValueAtRisk(confidence, horizon_days, float(historical), float(parametric), sigma_annual)
+
+
+def heatmap_matrix(risk, max_size=HEATMAP_MAX):
+    """Correlation matrix for display: clustered order, or cluster-averaged blocks past `max_size`."""
+    corr = risk.correlation.loc[risk.order, risk.order]
+    if len(corr) <= max_size:
+        return corr
+    # Contiguous runs of the clustering order become blocks; each cell is a block average
+    groups = np.array_split(np.arange(len(corr)), max_size)
+    values = corr.to_numpy()
+    blocks = np.array([[values[np.ix_(a, b)].mean() for b in groups] for a in groups])
+    labels = [f"{corr.index[g[0]]}…{corr.index[g[-1]]} ({len(g)})" for g in groups]
+    return pd.DataFrame(blocks, index=labels, columns=labels)
@@ -0,0 +1,58 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from price_store import ACTIONS, OHLCV, CSVSource, PriceStore
+
+
+class SplittingSource:
+    """Flat $100 stock with a 2:1 split on `split_day`; bars are adjusted as of the latest split seen."""
+
+    def __init__(self, split_day):
+        self.split_day = pd.Timestamp(split_day)
+        self.split_known = False
+        self.calls = []
+
+    def fetch(self, ticker, start, end):
+        self.calls.append((start, end))
+        days = pd.bdate_range(start, end)
+        close = np.where(days < self.split_day, 100.0, 50.0)
+        if self.split_known:
+            close = np.where(days < self.split_day, close / 2, close)
+        else:
+            days, close = days[days < self.split_day], close[days < self.split_day]
+        splits = np.where(days == self.split_day, 2.0, 0.0)
+        return pd.DataFrame({
+            "Open": close, "High": close, "Low": close, "Close": close, "Volume": 1e6,
+            "Dividends": 0.0, "Stock Splits": splits,
+        }, index=days)
+
+
+def test_split_in_top_up_refetches_adjusted_history(tmp_path):
+    source = SplittingSource(split_day=date(2024, 3, 1))
+    store = PriceStore(source, root=str(tmp_path))
+    assert (store.history("AAPL", date(2024, 1, 1), date(2024, 2, 29))["Close"] == 100.0).all()
+
+    source.split_known = True
+    bars = store.history("AAPL", date(2024, 1, 1), date(2024, 3, 29))
+    # No false jump at the seam: everything is on the post-split basis
+    assert (bars["Close"] == 50.0).all()
+    assert source.calls[-1] == (date(2024, 1, 1), date(2024, 3, 29))
+    assert list(bars.columns) == ["Open", "High", "Low", "Close", "Volume"]
+
+    calls = len(source.calls)
+    PriceStore(source, root=str(tmp_path)).history("AAPL", date(2024, 1, 1), date(2024, 3, 29))
+    assert len(source.calls) == calls
+
+
+def test_csv_source_keeps_split_actions(tmp_path):
+    days = pd.bdate_range("2024-02-26", "2024-03-08")
+    pd.DataFrame({
+        "Open": 50.0, "High": 50.0, "Low": 50.0, "Close": 50.0, "Volume": 1e6,
+        "Dividends": 0.0, "Stock Splits": np.where(days == pd.Timestamp("2024-03-01"), 2.0, 0.0),
+    }, index=days.rename("Date")).to_csv(tmp_path / "AAPL.csv")
+
+    bars = CSVSource(str(tmp_path)).fetch("AAPL", date(2024, 2, 26), date(2024, 3, 8))
+    assert bars.loc["2024-03-01", "Stock Splits"] == 2.0
+    assert list(bars.columns) == OHLCV + ACTIONS
@@ -1,56 +1,87 @@
+import os
+import sys
+import json
 import streamlit as st
-import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)  # repo root, for shared/
+from shared.llm_client import get_client
+from shared.llm_metrics import get_latency_log
 
 st.title("🧠 OpenRouter Model Selector + Chat")
 
 API_KEY = st.secrets["OPENROUTER_API_KEY"]
-API_BASE_URL = "https://openrouter.ai/api/v1"
-HEADERS = {
-    "Authorization": f"Bearer {API_KEY}",
-    "Content-Type": "application/json"
-}
+MODELS_PATH = os.path.join(REPO_ROOT, ".cache", "openrouter_models.json")
+DEFAULT_MODELS = ["openrouter/auto"]
+
+client = get_client("openrouter", API_KEY)
 
 # === Get available models ===
-@st.cache_data(ttl=3600)
-def get_available_models():
+@st.cache_resource(ttl=3600)
+def refresh_models():
+    # Runs on the client's background loop; the page renders from the saved list meanwhile
+    return client.models_future()
+
+def saved_models():
     try:
-        res = requests.get(f"{API_BASE_URL}/models", headers=HEADERS)
-        if res.status_code == 200:
-            models = res.json()["data"]
-            return sorted([m["id"] for m in models])
-        else:
-            st.error(f"⚠️ Could not fetch model list. Status: {res.status_code}")
-            st.text(res.text)
-            return ["openrouter/auto"]
-    except Exception as e:
-        st.error(f"⚠️ Error fetching models: {e}")
-        return ["openrouter/auto"]
+        with open(MODELS_PATH, encoding="utf-8") as f:
+            return json.load(f) or DEFAULT_MODELS
+    except (OSError, ValueError):
+        return DEFAULT_MODELS
+
+def get_available_models():
+    """Latest model list if the background fetch has finished, else the one saved last time."""
+    future = refresh_models()
+    if not future.done():
+        st.caption("Refreshing the model list in the background...")
+        return saved_models()
+    if future.exception() is not None:
+        st.warning(f"⚠️ Could not refresh the model list ({future.exception()}); using the saved one.")
+        refresh_models.clear()  # try again on the next rerun
+        return saved_models()
+    models = future.result()
+    if models != saved_models():
+        os.makedirs(os.path.dirname(MODELS_PATH), exist_ok=True)
+        with open(MODELS_PATH, "w", encoding="utf-8") as f:
+            json.dump(models, f)
+    return models
 
 models = get_available_models()
+if "openrouter/auto" not in models:
+    models = DEFAULT_MODELS + models
 model_choice = st.selectbox("🧩 Choose a model (or leave as auto)", models, index=models.index("openrouter/auto"))
 
 # === Get user prompt ===
 user_input = st.text_input("💬 Your question:", "What are the key trends in AI?")
 
 if user_input:
-    with st.spinner("🧠 Thinking..."):
-        payload = {
-            "model": model_choice,
-            "messages": [
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": user_input}
-            ]
-        }
-
-        try:
-            res = requests.post(f"{API_BASE_URL}/chat/completions", headers=HEADERS, json=payload)
-            if res.status_code == 200:
-                reply = res.json()["choices"][0]["message"]["content"]
-                st.success("✅ Response:")
-                st.markdown(reply)
-            else:
-                st.error(f"❌ Status: {res.status_code}")
-                st.text(res.text)
-
-        except Exception as e:
-            st.error(f"❌ Exception occurred: {e}")
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": user_input}
+    ]
+
+    try:
+        st.success("✅ Response:")
+        # Tokens are rendered as they arrive, so the wait is time-to-first-token, not the whole answer
+        st.write_stream(client.stream(model_choice, messages))
+    except Exception as e:
+        st.error(f"❌ Exception occurred: {e}")
+
+# === Latency per model ===
+# Logged by the client for every call, under the model that actually served it (e.g. behind openrouter/auto)
+latency = get_latency_log().summary()
+if latency:
+    with st.expander("⏱️ Model latency (median of recent calls)"):
+        st.dataframe(
+            [
+                {
+                    "Model": row["model"],
+                    "Calls": row["calls"],
+                    "Failures": row["failures"],
+                    "Time to first token (s)": row["median_ttft"],
+                    "Total (s)": row["median_total"],
+                }
+                for row in latency if row["provider"] == "openrouter"
+            ],
+            use_container_width=True,
+        )